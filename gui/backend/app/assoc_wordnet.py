@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import json
+import logging
 import random
 import time
 from dataclasses import dataclass
@@ -9,8 +10,12 @@ from typing import Any, Iterable, Literal
 import redis
 
 from .errors import ApiError
+from .redis_bits import int_to_le_bytes
 
-# WordNet bit-profile v1 (4096-bit integer stored as decimal string in Redis)
+logger = logging.getLogger("er_gui_backend")
+
+# WordNet bit-profile v1 (4096-bit integer stored in Redis as WN_DICT_TAG + raw little-endian bytes,
+# trailing zero bytes trimmed; older ingests wrote a decimal string, which load_bits_int still reads)
 #
 # 0–31   : POS / identification bits
 # 32–63  : frequency/root indicators (reserved)
@@ -19,6 +24,9 @@ from .errors import ApiError
 #
 # For now we only implement a small subset required by the Associations game.
 
+# Leading format byte of binary wn:dict values (a decimal string never starts with it).
+WN_DICT_TAG = b"\x01"
+
 BIT_POS_NOUN = 0
 BIT_POS_VERB = 1
 BIT_POS_ADJ = 2
@@ -175,15 +183,17 @@ def load_bits_int(*, r: redis.Redis, synset: str) -> int | None:
     raw = r.get(wn_dict_key(synset))
     if raw is None:
         return None
-    if isinstance(raw, bytes):
-        raw = raw.decode("utf-8", errors="replace")
-    s = str(raw).strip()
-    if not s:
-        return None
-    try:
-        return int(s)
-    except ValueError:
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    if not raw:
         return None
+    if raw[:1] == WN_DICT_TAG:
+        return int.from_bytes(raw[1:], "little")
+    if raw.isdigit():
+        return int(raw)
+    # Neither format: treat the synset as having no bits rather than failing the whole request.
+    logger.warning("unrecognized wn:dict value synset=%s len=%d", synset, len(raw))
+    return None
 
 
 def load_rels(*, r: redis.Redis, synset: str) -> dict[str, list[str]]:
@@ -598,7 +608,7 @@ def seed_demo(*, r: redis.Redis) -> dict[str, Any]:
         rels = info.get("rels") if isinstance(info.get("rels"), dict) else {}
         bits = info.get("bits") if isinstance(info.get("bits"), list) else []
         bits_int = _int_from_bits([int(x) for x in bits])
-        pipe.set(wn_dict_key(syn), str(bits_int))
+        pipe.set(wn_dict_key(syn), WN_DICT_TAG + int_to_le_bytes(bits_int))
         pipe.set(
             wn_meta_key(syn),
             _jdump({"synset": syn, "lemma": lemma, "lemmas": [lemma], "lexname": None, "domains": domains, "primary_domain": primary, "pos": pos}),
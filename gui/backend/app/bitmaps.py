@@ -63,6 +63,12 @@ def _legacy_bitmaps_path(*, presets_dir: str, preset: str) -> Path:
     return Path(presets_dir) / preset / "bitmaps.json"
 
 
+def bitmaps_source_paths(*, presets_dir: str, preset: str, ns: str) -> tuple[Path, Path]:
+    return _bitmaps_path(presets_dir=presets_dir, preset=preset, ns=ns), _legacy_bitmaps_path(
+        presets_dir=presets_dir, preset=preset
+    )
+
+
 def load_bitmaps_from_preset(
     *, presets_dir: str, preset: str, ns: str, logger: Any
 ) -> dict[str, Any]:
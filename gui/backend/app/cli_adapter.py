@@ -80,7 +80,7 @@ def er_cli_put(
 ) -> None:
     _run_er_cli(
         er_cli_path=er_cli_path,
-        args=["put", name, *[str(b) for b in bits]],
+        args=["put", name, *map(str, bits)],
         redis_host=redis_host,
         redis_port=redis_port,
         redis_prefix=redis_prefix,
@@ -2,15 +2,18 @@ from __future__ import annotations
 
 import logging
 import time
+import zlib
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 from urllib.parse import unquote
 
+import orjson
 import redis
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Response
 from fastapi.exceptions import RequestValidationError
 from fastapi.responses import JSONResponse
+from starlette.concurrency import run_in_threadpool
 
 from .cli_adapter import er_cli_put, er_cli_query_with_count, er_cli_store_key
 from .errors import ApiError, err, ok
@@ -24,10 +27,10 @@ from .models import (
     QueryRequest,
     StoreRequest,
 )
-from .redis_bits import decode_flags_bin, element_key_with_prefix
+from .redis_bits import decode_flags_bin, element_key_with_prefix, lua_script
 from .settings import load_settings
-from .bitmaps import load_bitmaps_from_preset, save_bitmaps_to_preset
-from .namespaces import NamespaceEntry, load_namespaces_from_preset, namespaces_to_map
+from .bitmaps import bitmaps_source_paths, load_bitmaps_from_preset, save_bitmaps_to_preset
+from .namespaces import NamespaceEntry, load_namespaces_map
 from .namespace_discovery import DiscoveryLimits, discover_namespaces, write_namespaces_generated
 from .examples import get_example_readme, list_examples, run_example, run_reports
 from .schema_meta import decode_column_meta, decode_relation_meta
@@ -60,9 +63,24 @@ _sh = logging.StreamHandler()
 _sh.setFormatter(_formatter)
 logger.addHandler(_sh)
 
+# redis-py picks the C reply parser automatically when hiredis is importable.
+logger.info("redis reply parser: %s", "hiredis" if redis.utils.HIREDIS_AVAILABLE else "python")
+
+
+_redis: redis.Redis | None = None
+
 
 def redis_client() -> redis.Redis:
-    return redis.Redis(host=settings.redis_host, port=settings.redis_port, decode_responses=False)
+    # One client (and connection pool) per process. A unix socket skips the TCP stack when Redis is local.
+    global _redis
+    if _redis is None:
+        if settings.redis_socket:
+            _redis = redis.Redis(unix_socket_path=settings.redis_socket, decode_responses=False)
+        else:
+            _redis = redis.Redis(
+                host=settings.redis_host, port=settings.redis_port, socket_keepalive=True, decode_responses=False
+            )
+    return _redis
 
 
 def _redis_used_memory(r: redis.Redis) -> int | None:
@@ -87,8 +105,7 @@ def _ensure_store_key_safe(store_key: str, *, prefix: str) -> None:
 
 
 def _resolve_ns_entry(ns: str | None) -> tuple[str, NamespaceEntry, dict[str, Any]]:
-    doc = load_namespaces_from_preset(presets_dir=settings.presets_dir, preset=settings.gui_preset, logger=logger)
-    default_id, mp = namespaces_to_map(doc)
+    doc, default_id, mp = load_namespaces_map(presets_dir=settings.presets_dir, preset=settings.gui_preset, logger=logger)
     ns_id = (ns or "").strip() or default_id
     ent = mp.get(ns_id)
     if not ent:
@@ -101,6 +118,50 @@ def _resolve_ns(ns: str | None) -> tuple[str, str]:
     return ns_id, ent.prefix
 
 
+# SCARD + TTL + bounded SSCAN preview for a stored result set, in one round-trip.
+STORE_SNAPSHOT_LUA = r"""
+local key = KEYS[1]
+local limit = tonumber(ARGV[1])
+local n = redis.call('SCARD', key)
+local ttl = redis.call('TTL', key)
+local out = {}
+if n > 0 and limit > 0 then
+  local cursor = '0'
+  repeat
+    local res = redis.call('SSCAN', key, cursor, 'COUNT', math.min(500, limit - #out))
+    cursor = res[1]
+    for _, m in ipairs(res[2]) do
+      if #out >= limit then break end
+      out[#out + 1] = m
+    end
+  until cursor == '0' or #out >= limit
+end
+return {n, ttl, out}
+"""
+
+
+def _store_snapshot(r: redis.Redis, key: str, *, limit: int) -> tuple[int, int, list[str]]:
+    count, ttl, members = lua_script(r, STORE_SNAPSHOT_LUA)(keys=[key], args=[int(limit)], client=r)
+    ttl_remaining = int(ttl) if isinstance(ttl, (int, float)) else -1
+    names = [m.decode("utf-8", errors="replace") if isinstance(m, bytes) else str(m) for m in members or []]
+    return int(count), ttl_remaining, names
+
+
+def _mtime_etag(*paths: Path, salt: str = "") -> str:
+    parts = [salt]
+    for p in paths:
+        try:
+            parts.append(f"{p.stat().st_mtime_ns:x}")
+        except OSError:
+            parts.append("-")
+    return f'W/"{zlib.crc32("|".join(parts).encode("utf-8")):08x}"'
+
+
+def _etag_matches(request: Request, response: Response, etag: str) -> bool:
+    response.headers["ETag"] = etag
+    return request.headers.get("if-none-match") == etag
+
+
 def _utc_now_iso() -> str:
     return datetime.now(timezone.utc).isoformat().replace("+00:00", "Z")
 
@@ -204,22 +265,27 @@ async def health() -> dict[str, Any]:
     )
 
 
-@app.get("/api/v1/config")
-async def config() -> dict[str, Any]:
-    return ok(
-        {
-            "backend_version": BACKEND_VERSION,
-            "er_prefix": settings.er_prefix,
-            "ttl_max_sec": int(settings.ttl_max_sec),
-            "default_limit": 200,
-            "max_query_limit": 5000,
-            "store_preview_limit": int(settings.store_preview_limit),
-        }
-    )
+@app.get("/api/v1/config", response_model=None)
+async def config(request: Request, response: Response) -> dict[str, Any] | Response:
+    data = {
+        "backend_version": BACKEND_VERSION,
+        "er_prefix": settings.er_prefix,
+        "ttl_max_sec": int(settings.ttl_max_sec),
+        "default_limit": 200,
+        "max_query_limit": 5000,
+        "store_preview_limit": int(settings.store_preview_limit),
+    }
+    etag = f'W/"{zlib.crc32(orjson.dumps(data, option=orjson.OPT_SORT_KEYS)):08x}"'
+    if _etag_matches(request, response, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return ok(data)
 
-@app.get("/api/v1/namespaces")
-async def namespaces() -> dict[str, Any]:
-    data = load_namespaces_from_preset(presets_dir=settings.presets_dir, preset=settings.gui_preset, logger=logger)
+@app.get("/api/v1/namespaces", response_model=None)
+async def namespaces(request: Request, response: Response) -> dict[str, Any] | Response:
+    etag = _mtime_etag(Path(settings.presets_dir) / settings.gui_preset / "namespaces.json", salt=settings.gui_preset)
+    if _etag_matches(request, response, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    data, _, _ = load_namespaces_map(presets_dir=settings.presets_dir, preset=settings.gui_preset, logger=logger)
     return ok(data)
 
 @app.get("/api/v1/namespaces/discover")
@@ -310,7 +376,7 @@ async def examples_reports(id: str, ns: str | None = None) -> dict[str, Any]:
 
 @app.get("/api/v1/explorer/namespaces")
 async def explorer_namespaces() -> list[dict[str, Any]]:
-    doc = load_namespaces_from_preset(presets_dir=settings.presets_dir, preset=settings.gui_preset, logger=logger)
+    doc, _, _ = load_namespaces_map(presets_dir=settings.presets_dir, preset=settings.gui_preset, logger=logger)
     ns_list = doc.get("namespaces") if isinstance(doc.get("namespaces"), list) else []
     r = redis_client()
 
@@ -453,8 +519,7 @@ async def explorer_element(encodedKey: str) -> dict[str, Any]:
     if not raw_key:
         raise ApiError("INVALID_INPUT", "encodedKey is required", status_code=422)
 
-    ns_doc = load_namespaces_from_preset(presets_dir=settings.presets_dir, preset=settings.gui_preset, logger=logger)
-    _, mp = namespaces_to_map(ns_doc)
+    _, _, mp = load_namespaces_map(presets_dir=settings.presets_dir, preset=settings.gui_preset, logger=logger)
     ns_id = None
     prefix = None
     for k, ent in mp.items():
@@ -581,9 +646,17 @@ async def explorer_namespace_bitmap(namespace: str, limit: int = 75, offset: int
     return {"namespace": ns_id, "bits": 4096, "elements": elements}
 
 
-@app.get("/api/v1/bitmaps")
-async def bitmaps(ns: str | None = None) -> dict[str, Any]:
+@app.get("/api/v1/bitmaps", response_model=None)
+async def bitmaps(request: Request, response: Response, ns: str | None = None) -> dict[str, Any] | Response:
     ns_id, prefix = _resolve_ns(ns)
+    # prefix comes from namespaces.json, so it is part of the validator alongside the bitmaps files.
+    etag = _mtime_etag(
+        *bitmaps_source_paths(presets_dir=settings.presets_dir, preset=settings.gui_preset, ns=ns_id),
+        Path(settings.presets_dir) / settings.gui_preset / "namespaces.json",
+        salt=f"{settings.gui_preset}:{ns_id}",
+    )
+    if _etag_matches(request, response, etag):
+        return Response(status_code=304, headers={"ETag": etag})
     data = load_bitmaps_from_preset(presets_dir=settings.presets_dir, preset=settings.gui_preset, ns=ns_id, logger=logger)
     data.setdefault("meta", {})
     if isinstance(data["meta"], dict):
@@ -609,9 +682,10 @@ async def bitmaps_put(document: dict[str, Any], ns: str | None = None) -> dict[s
 
 @app.post("/api/v1/elements/put")
 async def elements_put(req: PutRequest, ns: str | None = None) -> dict[str, Any]:
-    bits = sorted(set(req.bits))
+    bits = req.bits
     ns_id, prefix = _resolve_ns(ns or req.ns)
-    er_cli_put(
+    await run_in_threadpool(
+        er_cli_put,
         er_cli_path=settings.er_cli_path,
         redis_host=settings.redis_host,
         redis_port=settings.redis_port,
@@ -652,15 +726,16 @@ async def query(req: QueryRequest, ns: str | None = None) -> dict[str, Any]:
     if req.type == "find":
         args = ["find", str(req.bit)]
     elif req.type == "find_all":
-        args = ["find_all", *[str(b) for b in req.bits]]
+        args = ["find_all", *map(str, req.bits)]
     elif req.type == "find_any":
-        args = ["find_any", *[str(b) for b in req.bits]]
+        args = ["find_any", *map(str, req.bits)]
     elif req.type == "find_not":
-        args = ["find_not", str(req.include_bit), *[str(b) for b in req.exclude_bits]]
+        args = ["find_not", str(req.include_bit), *map(str, req.exclude_bits)]
     else:  # find_universe_not
-        args = ["find_universe_not", *[str(b) for b in req.exclude_bits]]
+        args = ["find_universe_not", *map(str, req.exclude_bits)]
 
-    count_from_cli, names = er_cli_query_with_count(
+    count_from_cli, names = await run_in_threadpool(
+        er_cli_query_with_count,
         er_cli_path=settings.er_cli_path,
         redis_host=settings.redis_host,
         redis_port=settings.redis_port,
@@ -684,13 +759,14 @@ async def store(req: StoreRequest, ns: str | None = None) -> dict[str, Any]:
             details={"ttl_sec": req.ttl_sec, "max_ttl_sec": int(settings.ttl_max_sec)},
         )
     if req.type == "find_all_store":
-        args = ["find_all_store", str(req.ttl_sec), *[str(b) for b in req.bits]]
+        args = ["find_all_store", str(req.ttl_sec), *map(str, req.bits)]
     elif req.type == "find_any_store":
-        args = ["find_any_store", str(req.ttl_sec), *[str(b) for b in req.bits]]
+        args = ["find_any_store", str(req.ttl_sec), *map(str, req.bits)]
     else:  # find_not_store
-        args = ["find_not_store", str(req.ttl_sec), str(req.include_bit), *[str(b) for b in req.exclude_bits]]
+        args = ["find_not_store", str(req.ttl_sec), str(req.include_bit), *map(str, req.exclude_bits)]
 
-    store_key = er_cli_store_key(
+    store_key = await run_in_threadpool(
+        er_cli_store_key,
         er_cli_path=settings.er_cli_path,
         redis_host=settings.redis_host,
         redis_port=settings.redis_port,
@@ -700,24 +776,8 @@ async def store(req: StoreRequest, ns: str | None = None) -> dict[str, Any]:
     _ensure_store_key_safe(store_key, prefix=prefix)
 
     r = redis_client()
-    ttl = r.ttl(store_key)
-    ttl_remaining = int(ttl) if isinstance(ttl, (int, float)) else -1
-    count = int(r.scard(store_key))
-
-    preview: list[str] = []
-    cursor = 0
     limit = max(0, int(settings.store_preview_limit))
-    while len(preview) < limit:
-        cursor, batch = r.sscan(store_key, cursor=cursor, count=min(500, limit - len(preview)))
-        for raw in batch:
-            if isinstance(raw, bytes):
-                preview.append(raw.decode("utf-8", errors="replace"))
-            else:
-                preview.append(str(raw))
-            if len(preview) >= limit:
-                break
-        if cursor == 0:
-            break
+    count, ttl_remaining, preview = _store_snapshot(r, store_key, limit=limit)
 
     return ok(
         {
@@ -739,23 +799,7 @@ async def store_inspect(store_key: str, limit: int = 200, ns: str | None = None)
         raise ApiError("INVALID_LIMIT", "limit must be 1..5000", status_code=422)
 
     r = redis_client()
-    ttl = r.ttl(store_key)
-    ttl_remaining = int(ttl) if isinstance(ttl, (int, float)) else -1
-    count = int(r.scard(store_key))
-
-    names: list[str] = []
-    cursor = 0
-    while len(names) < limit:
-        cursor, batch = r.sscan(store_key, cursor=cursor, count=min(500, limit - len(names)))
-        for raw in batch:
-            if isinstance(raw, bytes):
-                names.append(raw.decode("utf-8", errors="replace"))
-            else:
-                names.append(str(raw))
-            if len(names) >= limit:
-                break
-        if cursor == 0:
-            break
+    count, ttl_remaining, names = _store_snapshot(r, store_key, limit=limit)
 
     return ok(
         {
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from typing import Annotated, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import AfterValidator, BaseModel, Field
 
 
 Name = Annotated[str, Field(min_length=1, max_length=100)]
@@ -10,10 +10,14 @@ Bit = Annotated[int, Field(ge=0, le=4095)]
 TTL = Annotated[int, Field(gt=0)]
 
 
+def _sorted_unique(bits: list[int]) -> list[int]:
+    return sorted(set(bits))
+
+
 class PutRequest(BaseModel):
     ns: str | None = None
     name: Name
-    bits: list[Bit] = Field(min_length=1)
+    bits: Annotated[list[Bit], AfterValidator(_sorted_unique)] = Field(min_length=1)
 
 
 class QueryFind(BaseModel):
@@ -5,6 +5,7 @@ from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+import orjson
 import redis
 
 from .errors import ApiError
@@ -39,7 +40,7 @@ def _prefix_of(key: str) -> str:
     return key.split(":", 1)[0]
 
 
-def _infer_for_prefix(*, prefix: str, keys: list[str], r: redis.Redis) -> dict[str, Any]:
+def _infer_for_prefix(*, prefix: str, keys: list[str], types_raw: list[Any]) -> dict[str, Any]:
     evidence_counts: dict[str, Any] = {
         "total_keys": len(keys),
         "types": {"string": 0, "hash": 0, "set": 0, "zset": 0, "list": 0, "none": 0, "other": 0},
@@ -47,10 +48,14 @@ def _infer_for_prefix(*, prefix: str, keys: list[str], r: redis.Redis) -> dict[s
     }
     samples: dict[str, Any] = {"keys": [], "by_class": {"element": [], "idx_bit": [], "tmp": [], "universe": []}}
 
-    pipe = r.pipeline()
-    for k in keys:
-        pipe.type(k)
-    types_raw = pipe.execute()
+    # Key class by pattern; prefixes are built once instead of per sampled key.
+    universe_key = f"{prefix}:all"
+    class_prefixes = (
+        (f"{prefix}:element:", "element"),
+        (f"{prefix}:idx:bit:", "idx_bit"),
+        (f"{prefix}:tmp:", "tmp"),
+    )
+    pattern_counts = evidence_counts["patterns"]
 
     for k, t_raw in zip(keys, types_raw):
         t = _decode_type(t_raw)
@@ -62,20 +67,16 @@ def _infer_for_prefix(*, prefix: str, keys: list[str], r: redis.Redis) -> dict[s
             evidence_counts["types"]["other"] += 1
 
         cls = None
-        if k == f"{prefix}:all":
+        if k == universe_key:
             cls = "universe"
-            evidence_counts["patterns"]["universe"] += 1
-        elif k.startswith(f"{prefix}:element:"):
-            cls = "element"
-            evidence_counts["patterns"]["element"] += 1
-        elif k.startswith(f"{prefix}:idx:bit:"):
-            cls = "idx_bit"
-            evidence_counts["patterns"]["idx_bit"] += 1
-        elif k.startswith(f"{prefix}:tmp:"):
-            cls = "tmp"
-            evidence_counts["patterns"]["tmp"] += 1
+        else:
+            for pfx, name in class_prefixes:
+                if k.startswith(pfx):
+                    cls = name
+                    break
 
         if cls:
+            pattern_counts[cls] += 1
             bucket = samples["by_class"][cls]
             if len(bucket) < 20:
                 bucket.append({"key": k, "type": t})
@@ -148,9 +149,19 @@ def discover_namespaces(
         if cursor == 0 or seen >= max_keys:
             break
 
+    # TYPE for every sampled key of every prefix in one round-trip, then split back per prefix.
+    pipe = r.pipeline(transaction=False)
+    for info in prefixes.values():
+        for k in info["samples"]:
+            pipe.type(k)
+    types_all = pipe.execute() if prefixes else []
+
     inferred: list[dict[str, Any]] = []
+    offset = 0
     for pfx, info in prefixes.items():
-        inferred.append(_infer_for_prefix(prefix=pfx, keys=info["samples"], r=r))
+        n = len(info["samples"])
+        inferred.append(_infer_for_prefix(prefix=pfx, keys=info["samples"], types_raw=types_all[offset : offset + n]))
+        offset += n
 
     inferred.sort(key=lambda x: (-float(x.get("confidence") or 0.0), str(x.get("prefix") or "")))
     return {
@@ -192,7 +203,7 @@ def write_namespaces_generated(
     path.parent.mkdir(parents=True, exist_ok=True)
     tmp = path.with_suffix(".json.tmp")
     try:
-        tmp.write_text(__import__("json").dumps(out, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+        tmp.write_bytes(orjson.dumps(out, option=orjson.OPT_INDENT_2 | orjson.OPT_APPEND_NEWLINE))
         tmp.replace(path)
     except Exception as e:
         logger.warning("namespaces.generated.json write failed: %s (path=%s)", e, str(path))
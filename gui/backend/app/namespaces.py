@@ -119,6 +119,29 @@ def namespaces_to_map(namespaces_doc: dict[str, Any]) -> tuple[str, dict[str, Na
     return default_id, out
 
 
+_MAP_CACHE: dict[Path, tuple[int, dict[str, Any], str, dict[str, NamespaceEntry]]] = {}
+
+
+def load_namespaces_map(
+    *, presets_dir: str, preset: str, logger: Any
+) -> tuple[dict[str, Any], str, dict[str, NamespaceEntry]]:
+    # Keyed on namespaces.json mtime so a request only pays for a stat() when the file is unchanged.
+    path = Path(presets_dir) / preset / "namespaces.json"
+    try:
+        mtime_ns = path.stat().st_mtime_ns
+    except OSError:
+        mtime_ns = -1
+
+    hit = _MAP_CACHE.get(path)
+    if hit is not None and hit[0] == mtime_ns:
+        return hit[1], hit[2], hit[3]
+
+    doc = load_namespaces_from_preset(presets_dir=presets_dir, preset=preset, logger=logger)
+    default_id, mp = namespaces_to_map(doc)
+    _MAP_CACHE[path] = (mtime_ns, doc, default_id, mp)
+    return doc, default_id, mp
+
+
 def resolve_layout(namespaces_doc: dict[str, Any], layout_id: str) -> dict[str, Any] | None:
     layouts = namespaces_doc.get("layouts")
     if not isinstance(layouts, dict):
@@ -1,16 +1,19 @@
 from __future__ import annotations
 
+import os
 import sqlite3
+import threading
 import time
+from contextlib import contextmanager
 from dataclasses import dataclass
 from decimal import Decimal, ROUND_HALF_UP
 from pathlib import Path
-from typing import Any, Iterable, cast
+from typing import Any, Callable, Iterator
 
 import redis
 
 from .errors import ApiError
-from .redis_bits import element_key_with_prefix
+from .redis_bits import element_key_with_prefix, lua_script
 from .schema_meta import PROFILE_ID, bits_for_column, bits_for_relation, bits_for_table, encode_flags_bin
 
 TABLE_TOKENS: list[str] = [
@@ -46,6 +49,15 @@ TOKEN_TO_SQL_TABLE_CANDIDATES: dict[str, list[str]] = {
 }
 
 
+# Import batching: rows go out in EVALSHA batches capped by row count and by payload size (so wide
+# tables do not build oversized calls), and batches are pipelined until either the number of calls
+# or the queued payload reaches its cap.
+IMPORT_BATCH_ROWS = int(os.getenv("ER_GUI_IMPORT_BATCH_ROWS", "500"))
+IMPORT_BATCH_BYTES = int(os.getenv("ER_GUI_IMPORT_BATCH_BYTES", str(256 * 1024)))
+IMPORT_FLUSH_CALLS = int(os.getenv("ER_GUI_IMPORT_FLUSH_CALLS", "8"))
+IMPORT_FLUSH_BYTES = int(os.getenv("ER_GUI_IMPORT_FLUSH_BYTES", str(1024 * 1024)))
+
+
 @dataclass(frozen=True)
 class OrLayoutTemplates:
     universe_key: str
@@ -62,6 +74,15 @@ def _tpl(tpl: str, **vars: str) -> str:
     return out
 
 
+def _tpl_fn(tpl: str, var: str) -> Callable[[str], str]:
+    # For per-row keys: split the template around its single "{var}" once, so each row is one concat.
+    ph = "{" + var + "}"
+    head, sep, tail = tpl.partition(ph)
+    if sep and ph not in tail:
+        return lambda v: head + v + tail
+    return lambda v: tpl.replace(ph, v)
+
+
 def _require_str(d: dict[str, Any], key: str) -> str:
     v = d.get(key)
     if not isinstance(v, str) or not v.strip():
@@ -125,9 +146,60 @@ def resolve_sqlite_path(*, example_dir: Path, ref_path: str) -> Path:
     return resolved
 
 
-def _find_table(conn: sqlite3.Connection, candidates: list[str]) -> str | None:
+def _qident(name: str) -> str:
+    # SQLite identifier quoting ("" escapes an embedded quote); Python repr() quoting is not SQL.
+    return '"' + name.replace('"', '""') + '"'
+
+
+# Read-only reference DB connections, one per resolved path and per thread (sync routes run on
+# the threadpool, and a sqlite3 connection must not be shared across threads); replaced when the
+# file's mtime changes.
+_CONN_LOCAL = threading.local()
+
+
+def _ro_sqlite_conn(path: Path) -> sqlite3.Connection:
+    # The reference DB is only read here: open it read-only once, give it a larger page cache/mmap,
+    # and reuse it across imports/reports.
+    resolved = path.resolve()
+    mtime_ns = resolved.stat().st_mtime_ns
+    cache: dict[Path, tuple[int, sqlite3.Connection]] | None = getattr(_CONN_LOCAL, "conns", None)
+    if cache is None:
+        cache = _CONN_LOCAL.conns = {}
+    hit = cache.get(resolved)
+    if hit is not None and hit[0] == mtime_ns:
+        return hit[1]
+    if hit is not None:
+        hit[1].close()
+    conn = sqlite3.connect(f"{resolved.as_uri()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA query_only=1")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    conn.execute("PRAGMA cache_size=-65536")
+    conn.execute("PRAGMA mmap_size=268435456")
+    cache[resolved] = (mtime_ns, conn)
+    return conn
+
+
+@contextmanager
+def _open_ro_sqlite(path: Path) -> Iterator[sqlite3.Connection]:
+    # One read transaction per pass, so the whole pass sees a single, current snapshot; it is
+    # always released on exit so an idle cached connection never pins an old snapshot.
+    conn = _ro_sqlite_conn(path)
+    conn.execute("BEGIN")
+    try:
+        yield conn
+    finally:
+        conn.rollback()
+
+
+def _table_index(conn: sqlite3.Connection) -> dict[str, str]:
     rows = conn.execute("SELECT name FROM sqlite_master WHERE type='table'").fetchall()
-    by_lower = {str(r[0]).lower(): str(r[0]) for r in rows}
+    return {str(r[0]).lower(): str(r[0]) for r in rows}
+
+
+def _find_table(conn: sqlite3.Connection, candidates: list[str], *, tables: dict[str, str] | None = None) -> str | None:
+    # Pass `tables` (from _table_index) when resolving several tokens against the same DB.
+    by_lower = tables if tables is not None else _table_index(conn)
     for c in candidates:
         hit = by_lower.get(c.lower())
         if hit:
@@ -136,7 +208,7 @@ def _find_table(conn: sqlite3.Connection, candidates: list[str]) -> str | None:
 
 
 def _pk_columns(conn: sqlite3.Connection, sql_table: str) -> list[str]:
-    rows = conn.execute(f"PRAGMA table_info({sql_table!r})").fetchall()
+    rows = conn.execute(f"PRAGMA table_info({_qident(sql_table)})").fetchall()
     cols = []
     for row in rows:
         # row: cid,name,type,notnull,dflt_value,pk
@@ -147,24 +219,16 @@ def _pk_columns(conn: sqlite3.Connection, sql_table: str) -> list[str]:
     return cols
 
 
-def _table_info(conn: sqlite3.Connection, sql_table: str) -> list[sqlite3.Row]:
-    conn.row_factory = sqlite3.Row
-    return cast(list[sqlite3.Row], conn.execute(f"PRAGMA table_info({sql_table!r})").fetchall())
-
-
-def _index_list(conn: sqlite3.Connection, sql_table: str) -> list[sqlite3.Row]:
-    conn.row_factory = sqlite3.Row
-    return cast(list[sqlite3.Row], conn.execute(f"PRAGMA index_list({sql_table!r})").fetchall())
-
-
-def _index_info(conn: sqlite3.Connection, index_name: str) -> list[sqlite3.Row]:
-    conn.row_factory = sqlite3.Row
-    return cast(list[sqlite3.Row], conn.execute(f"PRAGMA index_info({index_name!r})").fetchall())
-
-
-def _fk_list(conn: sqlite3.Connection, sql_table: str) -> list[sqlite3.Row]:
-    conn.row_factory = sqlite3.Row
-    return cast(list[sqlite3.Row], conn.execute(f"PRAGMA foreign_key_list({sql_table!r})").fetchall())
+def _pragma_by_table(conn: sqlite3.Connection, sql_tables: list[str], source: str, select: str) -> dict[str, list[sqlite3.Row]]:
+    # One query over table-valued pragma functions for every table, instead of one PRAGMA per table.
+    out: dict[str, list[sqlite3.Row]] = {t: [] for t in sql_tables}
+    if not sql_tables:
+        return out
+    values = ",".join(["(?)"] * len(sql_tables))
+    sql = f"SELECT t.column1 AS tbl, {select} FROM (VALUES {values}) t, {source}"
+    for row in conn.execute(sql, sql_tables):
+        out[row["tbl"]].append(row)
+    return out
 
 
 def _row_pk(row: sqlite3.Row, pk_cols: list[str]) -> str:
@@ -179,16 +243,26 @@ def _row_pk(row: sqlite3.Row, pk_cols: list[str]) -> str:
     return ":".join(parts)
 
 
-def _iter_rows(conn: sqlite3.Connection, sql_table: str) -> Iterable[sqlite3.Row]:
-    conn.row_factory = sqlite3.Row
-    cur = conn.execute(f'SELECT * FROM "{sql_table}"')
-    for row in cur:
-        yield row
-
-
-def _hset_mapping(pipe: redis.client.Pipeline, key: str, mapping: dict[str, Any]) -> None:
-    # redis-py typing differs across versions; keep a small wrapper.
-    pipe.hset(key, mapping=mapping)
+def _select_rows(conn: sqlite3.Connection, sql_table: str) -> tuple[list[str], list[int], sqlite3.Cursor]:
+    # One PRAGMA table_info gives the column list, primary-key positions and the select list.
+    # Rows are plain tuples: sqlite3.Row resolves row[name] by scanning column names on every access.
+    cur = conn.cursor()
+    cur.row_factory = None
+    # row: cid,name,type,notnull,dflt_value,pk
+    info = cur.execute(f"PRAGMA table_info({_qident(sql_table)})").fetchall()
+    cols = [str(row[1]) for row in info]
+    pk_idx = [i for i, row in enumerate(info) if row[5] and int(row[5]) > 0]
+    # SQLite renders INTEGER/TEXT-affinity cells as text itself. REAL/NUMERIC columns stay raw so
+    # floats keep Python's str() rendering (CAST gives '0.333333333333333' for 1/3, '1.0e+20' for
+    # 1e20), and BLOB/untyped columns stay raw too; both go through _to_str.
+    exprs: list[str] = []
+    for col, row in zip(cols, info):
+        decl = str(row[2] or "").upper()
+        # Declared-type affinity, SQLite rules 1-2: INT -> INTEGER; CHAR/CLOB/TEXT -> TEXT.
+        cast = "INT" in decl or any(t in decl for t in ("CHAR", "CLOB", "TEXT"))
+        exprs.append(f"CAST({_qident(col)} AS TEXT)" if cast else _qident(col))
+    cur.execute(f'SELECT {", ".join(exprs)} FROM {_qident(sql_table)}')
+    return cols, pk_idx, cur
 
 
 def _to_str(v: Any) -> str:
@@ -199,24 +273,150 @@ def _to_str(v: Any) -> str:
     return str(v)
 
 
-def _decimal(v: Any) -> Decimal:
+_SCALE4 = 10_000
+
+
+def _fixed4(v: Any) -> int:
+    # Decimal text -> integer count of 1e-4 units (Northwind money/discount values carry <= 4 dp).
     s = _to_str(v).strip()
     if not s:
-        return Decimal("0")
-    return Decimal(s)
+        return 0
+    if "e" in s or "E" in s:
+        return int((Decimal(s) * _SCALE4).to_integral_value(rounding=ROUND_HALF_UP))
+    neg = s.startswith("-")
+    whole, _, frac = s.lstrip("+-").partition(".")
+    n = int((whole or "0") + frac[:4].ljust(4, "0"))
+    if len(frac) > 4 and frac[4] >= "5":
+        n += 1
+    return -n if neg else n
+
+
+def _line_total_e12(up: Any, qty: Any, disc: Any) -> int:
+    # UnitPrice * Quantity * (1 - Discount), exact, in units of 1e-12.
+    return _fixed4(up) * _fixed4(qty) * (_SCALE4 - _fixed4(disc))
+
+
+def _cents_half_up(total_e12: int) -> int:
+    q, rem = divmod(abs(total_e12), 10**10)
+    if rem * 2 >= 10**10:
+        q += 1
+    return -q if total_e12 < 0 else q
+
+
+def _fmt_cents(cents: int) -> str:
+    q, c = divmod(abs(cents), 100)
+    return f"{'-' if cents < 0 else ''}{q}.{c:02d}"
+
+
+# A batch of Northwind rows from one table: HSET each object hash, then index all batch members
+# with a few multi-member SADDs (table/registry/universe, plus per-order sets for OrderDetails).
+# All rows share the table's field names, so they are sent once up front:
+# ARGV = n_fields, field..., then per row: object_key, object_name, od_key ("" if none), value...
+IMPORT_ROWS_LUA = r"""
+local table_set = KEYS[1]
+local registry = KEYS[2]
+local universe = KEYS[3]
+
+local n_fields = tonumber(ARGV[1])
+local hset_args = {}
+for f = 1, n_fields do
+  hset_args[2 * f - 1] = ARGV[1 + f]
+end
+
+local names = {}
+local od_names = {}
+local i = 2 + n_fields
+local n = #ARGV
+while i <= n do
+  local object_key = ARGV[i]
+  local object_name = ARGV[i + 1]
+  local od_key = ARGV[i + 2]
+  for f = 1, n_fields do
+    hset_args[2 * f] = ARGV[i + 2 + f]
+  end
+  redis.call("HSET", object_key, unpack(hset_args))
+  names[#names + 1] = object_name
+  if od_key ~= "" then
+    local bucket = od_names[od_key]
+    if not bucket then
+      bucket = {}
+      od_names[od_key] = bucket
+    end
+    bucket[#bucket + 1] = object_name
+  end
+  i = i + 3 + n_fields
+end
 
+local function sadd_chunked(key, members)
+  for s = 1, #members, 1024 do
+    redis.call("SADD", key, unpack(members, s, math.min(s + 1023, #members)))
+  end
+end
 
-def _round_2(x: Decimal) -> Decimal:
-    return x.quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+sadd_chunked(table_set, names)
+sadd_chunked(registry, names)
+sadd_chunked(universe, names)
+for od_key, members in pairs(od_names) do
+  sadd_chunked(od_key, members)
+end
+return #names
+"""
 
 
-RESET_LUA = r"""
-local registry = KEYS[1]
-local universe = KEYS[2]
+# Order-details reducer: for each per-order index in KEYS, SMEMBERS it, HMGET each detail's
+# pricing fields and sum UnitPrice * Quantity * (1 - Discount) server-side in integer units of
+# 1e-8 (price and discount as 1e-4 fixed-point, Quantity as an integer). Returns one number per
+# order, in KEYS order.
+ORDER_TOTALS_LUA = r"""
+local obj_key_tpl = ARGV[1]
 
-local table_set_tpl = ARGV[1]
-local obj_key_tpl = ARGV[2]
-local order_details_by_order_tpl = ARGV[3]
+local function fixed4(s)
+  if not s then
+    return 0
+  end
+  local sign, whole, frac = string.match(s, "^%s*([+-]?)(%d*)%.?(%d*)%s*$")
+  if not sign then
+    local x = tonumber(s)
+    if not x then
+      return 0
+    end
+    return math.floor(x * 10000 + 0.5)
+  end
+  local n = tonumber((whole ~= "" and whole or "0") .. string.sub(frac .. "0000", 1, 4))
+  if #frac > 4 and string.sub(frac, 5, 5) >= "5" then
+    n = n + 1
+  end
+  if sign == "-" then
+    return -n
+  end
+  return n
+end
+
+local totals = {}
+for k, idx_key in ipairs(KEYS) do
+  local total = 0
+  for _, name in ipairs(redis.call("SMEMBERS", idx_key)) do
+    local id = string.match(name, "^[^:]+:(.+)$")
+    if id then
+      local key = string.gsub(obj_key_tpl, "{id}", (string.gsub(id, "%%", "%%%%")))
+      local v = redis.call("HMGET", key, "UnitPrice", "Quantity", "Discount")
+      local qty = tonumber(v[2]) or 0
+      if qty ~= math.floor(qty) then
+        return redis.error_reply("non-integer Quantity in " .. key)
+      end
+      total = total + fixed4(v[1]) * qty * (10000 - fixed4(v[3]))
+    end
+  end
+  totals[k] = total
+end
+return totals
+"""
+
+
+# One chunk of registry members: UNLINK their object hashes and report which tables/orders were
+# touched, so the caller can drop the index sets once the whole registry has been walked.
+RESET_LUA = r"""
+local obj_key_tpl = ARGV[1]
 
 local function fmt(tpl, vars)
   local out = tpl
@@ -226,66 +426,86 @@ local function fmt(tpl, vars)
   return out
 end
 
-local members = redis.call("SMEMBERS", registry)
 local deleted_objects = 0
+local seen_tables = {}
+local seen_orders = {}
 local tables = {}
 local orders = {}
 
-for _, name in ipairs(members) do
+for i = 2, #ARGV do
+  local name = ARGV[i]
   local table, id = string.match(name, "^([^:]+):(.+)$")
   if table and id then
-    tables[table] = true
-    local obj_key = fmt(obj_key_tpl, { table = table, id = id })
-    redis.call("DEL", obj_key)
-    redis.call("SREM", fmt(table_set_tpl, { table = table }), name)
-    redis.call("SREM", universe, name)
+    deleted_objects = deleted_objects + redis.call("UNLINK", fmt(obj_key_tpl, { table = table, id = id }))
+    if not seen_tables[table] then
+      seen_tables[table] = true
+      tables[#tables + 1] = table
+    end
     if table == "OrderDetails" then
       local order_id = string.match(id, "^([^:]+):")
-      if order_id then
-        orders[order_id] = true
-        redis.call("SREM", fmt(order_details_by_order_tpl, { order_id = order_id }), name)
+      if order_id and not seen_orders[order_id] then
+        seen_orders[order_id] = true
+        orders[#orders + 1] = order_id
       end
     end
-    deleted_objects = deleted_objects + 1
   end
 end
 
-for t,_ in pairs(tables) do
-  redis.call("DEL", fmt(table_set_tpl, { table = t }))
-end
-for o,_ in pairs(orders) do
-  redis.call("DEL", fmt(order_details_by_order_tpl, { order_id = o }))
-end
-
-redis.call("DEL", registry)
-redis.call("DEL", universe)
-
-return { deleted_objects, tostring(#members) }
+return { deleted_objects, tables, orders }
 """
 
 
-def reset_import(*, r: redis.Redis, prefix: str, tpl: OrLayoutTemplates) -> dict[str, Any]:
+def reset_import(*, r: redis.Redis, prefix: str, tpl: OrLayoutTemplates, with_schema_meta: bool = False) -> dict[str, Any]:
     pfx = (prefix or "").strip(":")
     if not pfx:
         raise ApiError("INVALID_INPUT", "invalid namespace prefix", status_code=422)
 
     registry_key = _tpl(tpl.import_registry_key, pfx=pfx)
     universe_key = _tpl(tpl.universe_key, pfx=pfx)
+    obj_key_tpl = _tpl(tpl.object_key, pfx=pfx, table="{table}", id="{id}")
 
+    reset_chunk = lua_script(r, RESET_LUA)
+    chunk_size = 500
+    scanned = 0
+    deleted = 0
+    tables: set[str] = set()
+    orders: set[str] = set()
+
+    def flush(chunk: list[str]) -> None:
+        nonlocal deleted
+        n, t, o = reset_chunk(keys=[], args=[obj_key_tpl, *chunk], client=r)
+        deleted += int(n)
+        tables.update(_to_str(x) for x in t)
+        orders.update(_to_str(x) for x in o)
+
+    # Walk the registry in small EVALSHA chunks so Redis is never blocked for the whole sweep;
+    # the registry itself is only unlinked at the end, so SSCAN sees a stable set.
     try:
-        deleted, scanned = r.eval(
-            RESET_LUA,
-            2,
-            registry_key,
-            universe_key,
-            _tpl(tpl.table_set_key, pfx=pfx, table="{table}"),
-            _tpl(tpl.object_key, pfx=pfx, table="{table}", id="{id}"),
-            _tpl(tpl.order_details_by_order_key, pfx=pfx, order_id="{order_id}"),
-        )
+        chunk: list[str] = []
+        for raw in r.sscan_iter(registry_key, count=chunk_size):
+            chunk.append(_to_str(raw))
+            scanned += 1
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        if chunk:
+            flush(chunk)
+
+        pipe = r.pipeline(transaction=False)
+        for t in tables:
+            pipe.unlink(_tpl(tpl.table_set_key, pfx=pfx, table=t))
+        for o in orders:
+            pipe.unlink(_tpl(tpl.order_details_by_order_key, pfx=pfx, order_id=o))
+        pipe.unlink(registry_key, universe_key)
+        pipe.execute()
+        schema_meta = _call_reset_schema_meta(r, pfx=pfx) if with_schema_meta else None
     except Exception as e:
         raise ApiError("REDIS_ERROR", "reset failed", status_code=502, details={"error": str(e)})
 
-    return {"scanned": int(scanned), "deleted_objects": int(deleted)}
+    out: dict[str, Any] = {"scanned": scanned, "deleted_objects": deleted}
+    if schema_meta is not None:
+        out["schema_meta"] = schema_meta
+    return out
 
 
 def _schema_meta_registry_key(*, prefix: str) -> str:
@@ -293,37 +513,77 @@ def _schema_meta_registry_key(*, prefix: str) -> str:
     return f"{pfx}:import:northwind_compare:schema_meta"
 
 
-def reset_schema_meta(*, r: redis.Redis, prefix: str) -> dict[str, Any]:
-    pfx = (prefix or "").strip(":")
-    if not pfx:
-        raise ApiError("INVALID_INPUT", "invalid namespace prefix", status_code=422)
+# Drop every schema-meta element listed in the registry, then the registry itself.
+# KEYS = registry; ARGV = element key prefix.
+RESET_SCHEMA_META_LUA = r"""
+local registry = KEYS[1]
+local element_prefix = ARGV[1]
 
-    reg = _schema_meta_registry_key(prefix=pfx)
-    names_raw = r.smembers(reg)
-    names = [n.decode("utf-8", errors="replace") if isinstance(n, (bytes, bytearray)) else str(n) for n in names_raw]
-    names = [n for n in names if n]
+local names = redis.call("SMEMBERS", registry)
+local element_keys = {}
+for _, name in ipairs(names) do
+  if name ~= "" then
+    element_keys[#element_keys + 1] = element_prefix .. name
+  end
+end
+-- Variadic UNLINK in chunks of up to 256 keys instead of one command per key.
+for s = 1, #element_keys, 256 do
+  redis.call("UNLINK", unpack(element_keys, s, math.min(s + 255, #element_keys)))
+end
+redis.call("UNLINK", registry)
 
-    pipe = r.pipeline(transaction=False)
-    deleted = 0
-    for name in names:
-        pipe.delete(element_key_with_prefix(pfx, name))
-        deleted += 1
-    pipe.delete(reg)
-
-    # Safety cleanup for older runs (or interrupted resets): scan known patterns.
-    extra_deleted = 0
-    for pat in (f"{pfx}:element:tbl:*", f"{pfx}:element:col:*", f"{pfx}:element:rel:*"):
-        for raw_key in r.scan_iter(match=pat, count=1000):
-            k = raw_key.decode("utf-8", errors="replace") if isinstance(raw_key, (bytes, bytearray)) else str(raw_key)
-            pipe.delete(k)
-            extra_deleted += 1
-            if extra_deleted >= 50_000:
+return #names
+"""
+
+# One SCAN page of the leftover sweep (older or interrupted runs); the caller drives the cursor so
+# Redis is only held for a single page at a time. ARGV = cursor, MATCH pattern, max keys to unlink.
+SWEEP_SCHEMA_META_LUA = r"""
+local res = redis.call("SCAN", ARGV[1], "MATCH", ARGV[2], "COUNT", 1000)
+local found = res[2]
+local cap = tonumber(ARGV[3])
+if #found > cap then
+  found = { unpack(found, 1, cap) }
+end
+local n = 0
+for s = 1, #found, 256 do
+  n = n + redis.call("UNLINK", unpack(found, s, math.min(s + 255, #found)))
+end
+return { res[1], n }
+"""
+
+SCHEMA_META_SWEEP_CAP = 50_000
+
+
+def _call_reset_schema_meta(r: redis.Redis, *, pfx: str) -> dict[str, Any]:
+    reg = _schema_meta_registry_key(prefix=pfx)
+    element_prefix = element_key_with_prefix(pfx, "")
+    scanned = int(lua_script(r, RESET_SCHEMA_META_LUA)(keys=[reg], args=[element_prefix], client=r))
+
+    sweep = lua_script(r, SWEEP_SCHEMA_META_LUA)
+    extra = 0
+    truncated = False
+    for kind in ("tbl", "col", "rel"):
+        pattern = f"{element_prefix}{kind}:*"
+        cursor = b"0"
+        while True:
+            if extra >= SCHEMA_META_SWEEP_CAP:
+                truncated = True
+                break
+            cursor, n = sweep(keys=[], args=[cursor, pattern, SCHEMA_META_SWEEP_CAP - extra], client=r)
+            extra += int(n)
+            if _to_str(cursor) == "0":
                 break
-        if extra_deleted >= 50_000:
+        if truncated:
             break
 
-    pipe.execute()
-    return {"registry_scanned": len(names), "deleted": deleted + extra_deleted}
+    return {"registry_scanned": scanned, "deleted": scanned + extra, "truncated": truncated}
+
+
+def reset_schema_meta(*, r: redis.Redis, prefix: str) -> dict[str, Any]:
+    pfx = (prefix or "").strip(":")
+    if not pfx:
+        raise ApiError("INVALID_INPUT", "invalid namespace prefix", status_code=422)
+    return _call_reset_schema_meta(r, pfx=pfx)
 
 
 def _safe_element_name(name: str) -> str | None:
@@ -354,32 +614,45 @@ def import_schema_meta(
 
     created = 0
     skipped = 0
+    # Many columns/relations share a bit pattern; encode each distinct 512-byte flags_bin once.
+    flags_by_bits: dict[frozenset[int], bytes] = {}
 
-    def write_meta(name: str, bits: set[int]) -> None:
-        nonlocal created, queued, pipe
+    def write_meta(name: str, bits: frozenset[int]) -> None:
+        nonlocal created, queued
         nm = _safe_element_name(name)
         if not nm:
             return
         key = element_key_with_prefix(pfx, nm)
-        flags_bin = encode_flags_bin(bits)
-        _hset_mapping(pipe, key, {"name": nm, "meta_profile": PROFILE_ID, "flags_bin": flags_bin})
+        flags_bin = flags_by_bits.get(bits)
+        if flags_bin is None:
+            flags_bin = flags_by_bits[bits] = encode_flags_bin(bits)
+        # Fixed field set: send the flat HSET argv directly rather than via hset(mapping=...).
+        pipe.execute_command("HSET", key, "name", nm, "meta_profile", PROFILE_ID, "flags_bin", flags_bin)
         pipe.sadd(reg, nm)
         created += 1
         queued += 2
         if queued >= max_queued:
             pipe.execute()
-            pipe = r.pipeline(transaction=False)
             queued = 0
 
+    sql_tables = list(table_map.values())
+    table_info = _pragma_by_table(conn, sql_tables, "pragma_table_info(t.column1) p", "p.*")
+    fk_list = _pragma_by_table(conn, sql_tables, "pragma_foreign_key_list(t.column1) p", "p.*")
+    index_info = _pragma_by_table(
+        conn,
+        sql_tables,
+        "pragma_index_list(t.column1) il, pragma_index_info(il.name) ii",
+        'il.name AS idx, il."unique" AS is_unique, il.origin AS origin, ii.name AS col',
+    )
+
     for token, sql_table in table_map.items():
         write_meta(f"tbl:{token}", bits_for_table())
 
-        ti = _table_info(conn, sql_table)
         col_notnull: dict[str, bool] = {}
         col_default: dict[str, bool] = {}
         col_pk: set[str] = set()
         declared_type: dict[str, str] = {}
-        for row in ti:
+        for row in table_info[sql_table]:
             col = str(row["name"])
             declared_type[col] = str(row["type"] or "")
             col_notnull[col] = bool(int(row["notnull"] or 0))
@@ -387,25 +660,24 @@ def import_schema_meta(
             if int(row["pk"] or 0) > 0:
                 col_pk.add(col)
 
-        idx_rows = _index_list(conn, sql_table)
+        index_cols: dict[str, set[str]] = {}
+        index_flags: dict[str, tuple[bool, str]] = {}
+        for row in index_info[sql_table]:
+            idx_name = str(row["idx"] or "")
+            if not idx_name or not row["col"]:
+                continue
+            index_cols.setdefault(idx_name, set()).add(str(row["col"]))
+            index_flags[idx_name] = (bool(int(row["is_unique"] or 0)), str(row["origin"] or ""))
         indexed_cols: set[str] = set()
         unique_sets: list[set[str]] = []
-        for idx in idx_rows:
-            idx_name = str(idx["name"] or "")
-            if not idx_name:
-                continue
-            unique = bool(int(idx["unique"] or 0))
-            origin = str(idx["origin"] or "") if "origin" in idx.keys() else ""
-            cols: set[str] = set()
-            for r0 in _index_info(conn, idx_name):
-                if "name" in r0.keys() and r0["name"]:
-                    cols.add(str(r0["name"]))
-            if unique and cols:
+        for idx_name, cols in index_cols.items():
+            unique, origin = index_flags[idx_name]
+            if unique:
                 unique_sets.append(cols)
-            if origin == "c" and cols:
+            if origin == "c":
                 indexed_cols |= cols
 
-        fk_rows = _fk_list(conn, sql_table)
+        fk_rows = fk_list[sql_table]
         fks_by_id: dict[int, list[sqlite3.Row]] = {}
         for rw in fk_rows:
             fk_id = int(rw["id"])
@@ -420,9 +692,7 @@ def import_schema_meta(
             fk_cols_set = set(fk_cols)
             fk_cols_all |= fk_cols_set
             child_mandatory = all(col_notnull.get(c, False) for c in fk_cols)
-
-            pk_cols = set(_pk_columns(conn, sql_table))
-            is_unique_child = (fk_cols_set and fk_cols_set == pk_cols) or any(fk_cols_set == u for u in unique_sets)
+            is_unique_child = (fk_cols_set and fk_cols_set == col_pk) or any(fk_cols_set == u for u in unique_sets)
 
             on_update = str(rows[0]["on_update"] or "")
             on_delete = str(rows[0]["on_delete"] or "")
@@ -474,80 +744,101 @@ def import_northwind(
     reset_info = None
     reset_schema_info = None
     if reset:
-        reset_info = reset_import(r=r, prefix=pfx, tpl=tpl)
-        reset_schema_info = reset_schema_meta(r=r, prefix=pfx)
-
-    conn = sqlite3.connect(str(sqlite_path))
-    conn.row_factory = sqlite3.Row
-
-    table_map: dict[str, str] = {}
-    for token in TABLE_TOKENS:
-        sql_name = _find_table(conn, TOKEN_TO_SQL_TABLE_CANDIDATES.get(token, [token]))
-        if sql_name:
-            table_map[token] = sql_name
-
-    if not table_map.get("Customers") or not table_map.get("Orders") or not table_map.get("OrderDetails"):
-        raise ApiError(
-            "INVALID_INPUT",
-            "expected Northwind tables not found (need Customers, Orders, Order Details)",
-            status_code=422,
-            details={"found": sorted(table_map.keys())},
-        )
-
-    pipe = r.pipeline(transaction=False)
-    queued = 0
-    max_queued = 8000
-
-    registry_key = _tpl(tpl.import_registry_key, pfx=pfx)
-    universe_key = _tpl(tpl.universe_key, pfx=pfx)
-
-    table_counts: dict[str, int] = {}
-    imported_tables: list[str] = []
+        reset_info = reset_import(r=r, prefix=pfx, tpl=tpl, with_schema_meta=True)
+        reset_schema_info = reset_info.pop("schema_meta")
+
+    with _open_ro_sqlite(sqlite_path) as conn:
+
+        tables = _table_index(conn)
+        table_map: dict[str, str] = {}
+        for token in TABLE_TOKENS:
+            sql_name = _find_table(conn, TOKEN_TO_SQL_TABLE_CANDIDATES.get(token, [token]), tables=tables)
+            if sql_name:
+                table_map[token] = sql_name
+
+        if not table_map.get("Customers") or not table_map.get("Orders") or not table_map.get("OrderDetails"):
+            raise ApiError(
+                "INVALID_INPUT",
+                "expected Northwind tables not found (need Customers, Orders, Order Details)",
+                status_code=422,
+                details={"found": sorted(table_map.keys())},
+            )
 
-    for token, sql_table in table_map.items():
-        pk_cols = _pk_columns(conn, sql_table)
-        table_set_key = _tpl(tpl.table_set_key, pfx=pfx, table=token)
-        rows = 0
-        for row in _iter_rows(conn, sql_table):
-            pk = _row_pk(row, pk_cols)
-            object_name = f"{token}:{pk}"
-            object_key = _tpl(tpl.object_key, pfx=pfx, table=token, id=pk)
-
-            mapping: dict[str, str] = {"__table": token, "__id": pk, "__name": object_name}
-            for k in row.keys():
-                mapping[str(k)] = _to_str(row[k])
-
-            _hset_mapping(pipe, object_key, mapping)
-            pipe.sadd(table_set_key, object_name)
-            pipe.sadd(registry_key, object_name)
-            pipe.sadd(universe_key, object_name)
-
-            inc = 4
-            if token == "OrderDetails":
-                order_id = pk.split(":", 1)[0]
-                od_key = _tpl(tpl.order_details_by_order_key, pfx=pfx, order_id=order_id)
-                pipe.sadd(od_key, object_name)
-                inc += 1
-
-            queued += inc
-            rows += 1
-            if queued >= max_queued:
-                pipe.execute()
-                pipe = r.pipeline(transaction=False)
-                queued = 0
-
-        if queued:
+        import_rows = lua_script(r, IMPORT_ROWS_LUA)
+        pipe = r.pipeline(transaction=False)
+        queued_calls = 0
+        queued_bytes = 0
+
+        registry_key = _tpl(tpl.import_registry_key, pfx=pfx)
+        universe_key = _tpl(tpl.universe_key, pfx=pfx)
+
+        table_counts: dict[str, int] = {}
+        imported_tables: list[str] = []
+
+        for token, sql_table in table_map.items():
+            table_set_key = _tpl(tpl.table_set_key, pfx=pfx, table=token)
+            index_keys = [table_set_key, registry_key, universe_key]
+            # pfx/table are fixed for the table; bind them once so rows only substitute their id.
+            object_key_for = _tpl_fn(_tpl(tpl.object_key, pfx=pfx, table=token), "id")
+            od_key_for = _tpl_fn(_tpl(tpl.order_details_by_order_key, pfx=pfx), "order_id") if token == "OrderDetails" else None
+            rows = 0
+            batch: list[str] = []
+            batch_rows = 0
+            batch_bytes = 0
+            cols, pk_idx, cur = _select_rows(conn, sql_table)
+            if not pk_idx:
+                raise ApiError("INVALID_INPUT", "table has no primary key", status_code=422, details={"table": sql_table})
+            batch_head = [str(len(cols) + 3), "__table", "__id", "__name", *cols]
+            for row in cur:
+                # The pk is read straight off the row tuple that also feeds the field/value pairs below.
+                pk_vals = [row[i] for i in pk_idx]
+                if None in pk_vals:
+                    raise ApiError(
+                        "INVALID_INPUT",
+                        "primary key is NULL",
+                        status_code=422,
+                        details={"column": cols[pk_idx[pk_vals.index(None)]]},
+                    )
+                pk = ":".join(map(str, pk_vals))
+                object_name = f"{token}:{pk}"
+                object_key = object_key_for(pk)
+                od_key = od_key_for(pk.partition(":")[0]) if od_key_for else ""
+
+                cells = [v if type(v) is str else _to_str(v) for v in row]
+                batch += (object_key, object_name, od_key, token, pk, object_name)
+                batch += cells
+
+                rows += 1
+                batch_rows += 1
+                batch_bytes += len(object_key) + 2 * len(object_name) + len(od_key) + sum(map(len, cells))
+                if batch_rows >= IMPORT_BATCH_ROWS or batch_bytes >= IMPORT_BATCH_BYTES:
+                    import_rows(keys=index_keys, args=batch_head + batch, client=pipe)
+                    queued_calls += 1
+                    queued_bytes += batch_bytes
+                    batch = []
+                    batch_rows = 0
+                    batch_bytes = 0
+                    if queued_calls >= IMPORT_FLUSH_CALLS or queued_bytes >= IMPORT_FLUSH_BYTES:
+                        # execute() resets the pipeline in place, so the same object is reused for the next batch.
+                        pipe.execute()
+                        queued_calls = 0
+                        queued_bytes = 0
+
+            if batch:
+                import_rows(keys=index_keys, args=batch_head + batch, client=pipe)
+                queued_calls += 1
+                queued_bytes += batch_bytes
+
+            table_counts[token] = rows
+            imported_tables.append(token)
+
+        if queued_calls:
             pipe.execute()
-            pipe = r.pipeline(transaction=False)
-            queued = 0
-
-        table_counts[token] = rows
-        imported_tables.append(token)
 
-    elapsed_ms = int((time.perf_counter() - t0) * 1000)
-    logger.info("northwind_compare import ns_prefix=%s tables=%d elapsed_ms=%d", pfx, len(imported_tables), elapsed_ms)
+        elapsed_ms = int((time.perf_counter() - t0) * 1000)
+        logger.info("northwind_compare import ns_prefix=%s tables=%d elapsed_ms=%d", pfx, len(imported_tables), elapsed_ms)
 
-    schema_meta = import_schema_meta(r=r, prefix=pfx, conn=conn, table_map=table_map, logger=logger)
+        schema_meta = import_schema_meta(r=r, prefix=pfx, conn=conn, table_map=table_map, logger=logger)
 
     out: dict[str, Any] = {
         "table_counts": table_counts,
@@ -565,15 +856,30 @@ def import_northwind(
 
 def report_row_counts(*, r: redis.Redis, prefix: str, tpl: OrLayoutTemplates, sqlite_path: Path) -> list[dict[str, Any]]:
     pfx = (prefix or "").strip(":")
-    conn = sqlite3.connect(str(sqlite_path))
-    out: list[dict[str, Any]] = []
+    with _open_ro_sqlite(sqlite_path) as conn:
+
+        tables = _table_index(conn)
+        present: list[tuple[str, str]] = []
+        for token in TABLE_TOKENS:
+            sql_table = _find_table(conn, TOKEN_TO_SQL_TABLE_CANDIDATES.get(token, [token]), tables=tables)
+            if sql_table:
+                present.append((token, sql_table))
+
+        # All table counts in a single statement instead of one COUNT(*) query per table.
+        sqlite_counts: dict[int, int] = {}
+        if present:
+            sql = " UNION ALL ".join(f'SELECT {i}, COUNT(*) FROM {_qident(t)}' for i, (_, t) in enumerate(present))
+            sqlite_counts = {int(ix): int(n) for ix, n in conn.execute(sql).fetchall()}
+        found = [(token, sqlite_counts.get(i, 0)) for i, (token, _) in enumerate(present)]
+
+    pipe = r.pipeline(transaction=False)
+    for token, _ in found:
+        pipe.scard(_tpl(tpl.table_set_key, pfx=pfx, table=token))
+    redis_counts = pipe.execute() if found else []
 
-    for token in TABLE_TOKENS:
-        sql_table = _find_table(conn, TOKEN_TO_SQL_TABLE_CANDIDATES.get(token, [token]))
-        if not sql_table:
-            continue
-        sqlite_count = int(conn.execute(f'SELECT COUNT(*) FROM "{sql_table}"').fetchone()[0])
-        redis_count = int(r.scard(_tpl(tpl.table_set_key, pfx=pfx, table=token)))
+    out: list[dict[str, Any]] = []
+    for (token, sqlite_count), raw_count in zip(found, redis_counts):
+        redis_count = int(raw_count)
         out.append(
             {
                 "table": token,
@@ -585,6 +891,32 @@ def report_row_counts(*, r: redis.Redis, prefix: str, tpl: OrLayoutTemplates, sq
     return out
 
 
+def _order_totals_pipelined(r: redis.Redis, *, idx_keys: list[str], obj_key_tpl: str) -> list[int]:
+    # Flush 1: every per-order index. Flush 2: pricing fields of every detail. Totals in 1e-12 units.
+    pipe = r.pipeline(transaction=False)
+    for idx_key in idx_keys:
+        pipe.smembers(idx_key)
+    members_by_order = pipe.execute()
+
+    counts: list[int] = []
+    for members in members_by_order:
+        n = 0
+        for raw in members:
+            _, sep, pk = _to_str(raw).partition(":")
+            if sep:
+                pipe.hmget(obj_key_tpl.replace("{id}", pk), "UnitPrice", "Quantity", "Discount")
+                n += 1
+        counts.append(n)
+    lines = pipe.execute() if sum(counts) else []
+
+    totals: list[int] = []
+    pos = 0
+    for n in counts:
+        totals.append(sum(_line_total_e12(*v) for v in lines[pos : pos + n]))
+        pos += n
+    return totals
+
+
 def report_order_totals_sample(
     *,
     r: redis.Redis,
@@ -597,63 +929,53 @@ def report_order_totals_sample(
         raise ApiError("INVALID_INPUT", "limit out of range", status_code=422)
 
     pfx = (prefix or "").strip(":")
-    conn = sqlite3.connect(str(sqlite_path))
-    conn.row_factory = sqlite3.Row
-
-    orders_table = _find_table(conn, TOKEN_TO_SQL_TABLE_CANDIDATES["Orders"])
-    od_table = _find_table(conn, TOKEN_TO_SQL_TABLE_CANDIDATES["OrderDetails"])
-    if not orders_table or not od_table:
-        raise ApiError("INVALID_INPUT", "missing Orders or Order Details", status_code=422)
-
-    order_ids = [str(rw["OrderID"]) for rw in conn.execute(f'SELECT OrderID FROM "{orders_table}" ORDER BY OrderID LIMIT ?', (limit,))]
+    with _open_ro_sqlite(sqlite_path) as conn:
+
+        tables = _table_index(conn)
+        orders_table = _find_table(conn, TOKEN_TO_SQL_TABLE_CANDIDATES["Orders"], tables=tables)
+        od_table = _find_table(conn, TOKEN_TO_SQL_TABLE_CANDIDATES["OrderDetails"], tables=tables)
+        if not orders_table or not od_table:
+            raise ApiError("INVALID_INPUT", "missing Orders or Order Details", status_code=422)
+
+        # SQLite totals: sample the orders and sum their lines in one statement. Each factor is scaled
+        # to an integer count of 1e-4 units before multiplying, so SUM() is exact integer math in
+        # 1e-12 units (same representation as _line_total_e12) and rounding stays in _cents_half_up.
+        def e4(col: str) -> str:
+            return f"CAST(ROUND(COALESCE(od.{_qident(col)}, 0) * {_SCALE4}) AS INTEGER)"
+
+        sql = (
+            f"WITH sample AS (SELECT OrderID FROM {_qident(orders_table)} ORDER BY OrderID LIMIT ?) "
+            f"SELECT s.OrderID, COALESCE(SUM({e4('UnitPrice')} * {e4('Quantity')} * ({_SCALE4} - {e4('Discount')})), 0) "
+            f"FROM sample s LEFT JOIN {_qident(od_table)} od ON od.OrderID = s.OrderID "
+            "GROUP BY s.OrderID ORDER BY s.OrderID"
+        )
+        sqlite_totals: dict[str, int] = {str(oid): _cents_half_up(int(total)) for oid, total in conn.execute(sql, (limit,))}
+    order_ids = list(sqlite_totals)
     if not order_ids:
         return []
 
-    # SQLite totals (rounded)
-    sqlite_totals: dict[str, Decimal] = {}
-    for oid in order_ids:
-        total = Decimal("0")
-        rows = conn.execute(
-            f'SELECT UnitPrice, Quantity, Discount FROM "{od_table}" WHERE OrderID = ?',
-            (oid,),
-        ).fetchall()
-        for rw in rows:
-            up = _decimal(rw[0])
-            qty = _decimal(rw[1])
-            disc = _decimal(rw[2])
-            total += up * qty * (Decimal("1") - disc)
-        total = _round_2(total)
-        sqlite_totals[oid] = total
-
-    # Redis totals (rounded with same rule)
-    redis_totals: dict[str, Decimal] = {}
-    for oid in order_ids:
-        idx_key = _tpl(tpl.order_details_by_order_key, pfx=pfx, order_id=oid)
-        members = r.smembers(idx_key)
-        total = Decimal("0")
-        for raw_name in members:
-            name = _to_str(raw_name)
-            # "OrderDetails:<OrderID>:<ProductID>"
-            _, pk = name.split(":", 1)
-            obj_key = _tpl(tpl.object_key, pfx=pfx, table="OrderDetails", id=pk)
-            unit_price, quantity, discount = r.hmget(obj_key, "UnitPrice", "Quantity", "Discount")
-            up = _decimal(unit_price)
-            qty = _decimal(quantity)
-            disc = _decimal(discount)
-            total += up * qty * (Decimal("1") - disc)
-        redis_totals[oid] = _round_2(total)
+    # Redis totals (rounded with same rule); a single EVALSHA covers every sampled order.
+    # The script returns each order's sum in 1e-8 units; lift it to 1e-12 for _cents_half_up.
+    obj_key_tpl = _tpl(tpl.object_key, pfx=pfx, table="OrderDetails")
+    idx_keys = [_tpl(tpl.order_details_by_order_key, pfx=pfx, order_id=oid) for oid in order_ids]
+    try:
+        totals = lua_script(r, ORDER_TOTALS_LUA)(keys=idx_keys, args=[obj_key_tpl], client=r)
+        totals_e12 = [int(total) * _SCALE4 for total in totals]
+    except redis.exceptions.ResponseError:
+        # Scripting disabled/unsupported (or a non-integer Quantity): same sums from two pipelined flushes.
+        totals_e12 = _order_totals_pipelined(r, idx_keys=idx_keys, obj_key_tpl=obj_key_tpl)
+    redis_totals = {oid: _cents_half_up(total) for oid, total in zip(order_ids, totals_e12)}
 
     out: list[dict[str, Any]] = []
     for oid in order_ids:
-        st = sqlite_totals.get(oid, Decimal("0"))
-        rt = redis_totals.get(oid, Decimal("0"))
-        diff = _round_2(rt - st)
+        st = sqlite_totals.get(oid, 0)
+        rt = redis_totals.get(oid, 0)
         out.append(
             {
                 "order_id": oid,
-                "sqlite_total": str(st),
-                "redis_total": str(rt),
-                "diff": str(diff),
+                "sqlite_total": _fmt_cents(st),
+                "redis_total": _fmt_cents(rt),
+                "diff": _fmt_cents(rt - st),
             }
         )
     return out
@@ -1,24 +1,43 @@
 from __future__ import annotations
 
+import hashlib
+import os
 import sqlite3
 import time
 from pathlib import Path
 from typing import Any, Iterable, cast
 
+import orjson
 import redis
 
 from .errors import ApiError
 from .examples import list_examples
-from .northwind_compare import TOKEN_TO_SQL_TABLE_CANDIDATES, _find_table, _iter_rows, _pk_columns, _row_pk, resolve_sqlite_path
+from .northwind_compare import (
+    TOKEN_TO_SQL_TABLE_CANDIDATES,
+    _find_table,
+    _open_ro_sqlite,
+    _pk_columns,
+    _qident,
+    _row_pk,
+    resolve_sqlite_path,
+)
 from .northwind_data_bits import (
+    BIT_PROFILE_VERSION,
+    ENCODED_COLUMNS,
     SUPPORTED_TABLE_TOKENS,
     BitCondition,
     bit_conditions_for,
-    data_key,
+    data_hash_key,
+    data_state_key,
     data_registry_key,
     encode_row_bits,
     sql_expr_for,
 )
+from .redis_bits import int_to_le_bytes, lua_script
+
+# Rows per HSET command, and rows queued in the pipeline before it is executed.
+DATA_BATCH_ROWS = int(os.getenv("ER_GUI_DATA_BATCH_ROWS", "1000"))
+DATA_FLUSH_ROWS = int(os.getenv("ER_GUI_DATA_FLUSH_ROWS", "10000"))
 
 
 def _example_dir_and_sqlite_path() -> tuple[Path, Path, str]:
@@ -30,11 +49,19 @@ def _example_dir_and_sqlite_path() -> tuple[Path, Path, str]:
     return example_dir, sqlite_path, ex.reference.path
 
 
-def _row_to_dict(row: sqlite3.Row) -> dict[str, Any]:
-    out: dict[str, Any] = {}
-    for k in row.keys():
-        out[str(k)] = row[k]
-    return out
+def _select_encoded_rows(conn: sqlite3.Connection, *, token: str, sql_table: str) -> tuple[int, list[str], sqlite3.Cursor]:
+    # Project only the pk and the columns the bit encoder reads: rows come back as
+    # (pk..., encoded...) tuples, and wide/BLOB columns (e.g. Categories.Picture) are never fetched.
+    info = conn.execute(f"PRAGMA table_info({_qident(sql_table)})").fetchall()
+    names = [str(row[1]) for row in info]
+    pk_cols = [str(row[1]) for row in info if row[5] and int(row[5]) > 0]
+    if not pk_cols:
+        raise ApiError("INVALID_INPUT", "table has no primary key", status_code=422, details={"table": sql_table})
+    enc_cols = [c for c in ENCODED_COLUMNS.get(token, []) if c in names]
+    cur = conn.cursor()
+    cur.row_factory = None
+    cur.execute(f"SELECT {', '.join(_qident(c) for c in pk_cols + enc_cols)} FROM {_qident(sql_table)}")
+    return len(pk_cols), enc_cols, cur
 
 
 def _sql_table_for_token(conn: sqlite3.Connection, token: str) -> str:
@@ -49,6 +76,7 @@ def _sql_table_for_token(conn: sqlite3.Connection, token: str) -> str:
 
 
 def reset_data_ingest(*, r: redis.Redis, prefix: str) -> dict[str, Any]:
+    # Registry members are the per-table data hashes (or per-row keys written by older versions).
     reg = data_registry_key(prefix)
     members = r.smembers(reg)
     keys = [m.decode("utf-8", errors="replace") if isinstance(m, (bytes, bytearray)) else str(m) for m in members]
@@ -58,12 +86,11 @@ def reset_data_ingest(*, r: redis.Redis, prefix: str) -> dict[str, Any]:
     pipe = r.pipeline(transaction=False)
     batch = 0
     for k in keys:
-        pipe.delete(k)
+        pipe.unlink(k)
         batch += 1
         if batch >= 500:
             res = pipe.execute()
             deleted += sum(1 for x in res if isinstance(x, (int, float)) and int(x) > 0)
-            pipe = r.pipeline(transaction=False)
             batch = 0
     if batch:
         res = pipe.execute()
@@ -89,7 +116,6 @@ def ingest_data_rows(
         reset_data_ingest(r=r, prefix=pfx)
 
     _, sqlite_path, ref_path = _example_dir_and_sqlite_path()
-    conn = sqlite3.connect(str(sqlite_path))
 
     requested = [(t or "").strip() for t in (tables or SUPPORTED_TABLE_TOKENS)]
     requested = [t for t in requested if t in SUPPORTED_TABLE_TOKENS]
@@ -97,78 +123,111 @@ def ingest_data_rows(
         raise ApiError("INVALID_INPUT", "no supported tables requested", status_code=422, details={"tables": tables})
 
     reg = data_registry_key(pfx)
+
+    # Same SQLite file, bit profile and request as the last completed ingest: the stored bitsets
+    # are already current, so return that run's counts instead of re-encoding every row.
+    st = sqlite_path.stat()
+    fingerprint = hashlib.blake2b(
+        f"{BIT_PROFILE_VERSION}:{st.st_mtime_ns}:{st.st_size}:{','.join(requested)}:{max_rows_per_table}".encode(),
+        digest_size=16,
+    ).hexdigest()
+    state_key = data_state_key(pfx)
+    if not reset:
+        prev_fp, prev_counts = r.hmget(state_key, ["fingerprint", "counts"])
+        if prev_fp is not None and prev_counts is not None and bytes(prev_fp).decode() == fingerprint:
+            return {
+                "sqlite": {"ref_path": ref_path, "path": str(sqlite_path)},
+                "registry_key": reg,
+                **orjson.loads(prev_counts),
+                "unchanged": True,
+                "elapsed_ms": int((time.perf_counter() - t0) * 1000),
+            }
+
     created_by_table: dict[str, int] = {t: 0 for t in requested}
     processed_by_table: dict[str, int] = {t: 0 for t in requested}
+    empty_by_table: dict[str, int] = {t: 0 for t in requested}
 
+    # Each table is one hash ({pfx}:data:<Table>, field = row id); rows are buffered and written
+    # as one variadic HSET per batch, and only the hash key itself goes into the registry. Several
+    # batches share one pipeline round trip.
     pipe = r.pipeline(transaction=False)
-    pending = 0
-
-    for token in requested:
-        sql_table = _sql_table_for_token(conn, token)
-        pk_cols = _pk_columns(conn, sql_table)
-        count = 0
-        for row in _iter_rows(conn, sql_table):
-            processed_by_table[token] += 1
-            if max_rows_per_table and processed_by_table[token] > max_rows_per_table:
-                break
-
-            row_id = _row_pk(row, pk_cols)
-            bits_int = encode_row_bits(table=token, row=_row_to_dict(row))
-            k = data_key(pfx, token, row_id)
-            pipe.set(k, str(bits_int))
-            pipe.sadd(reg, k)
-            pending += 2
-            count += 1
-            if pending >= 2000:
-                pipe.execute()
-                pipe = r.pipeline(transaction=False)
-                pending = 0
-        created_by_table[token] = count
-
-    if pending:
-        pipe.execute()
+    pending_map: dict[str, bytes] = {}
+    # Rows that now encode to no bits; drop any field a previous ingest left for them.
+    pending_del: list[str] = []
+    queued_rows = 0
+
+    def flush(hkey: str) -> None:
+        nonlocal queued_rows
+        if pending_map:
+            pipe.hset(hkey, mapping=pending_map)
+        if pending_del:
+            pipe.hdel(hkey, *pending_del)
+        queued_rows += len(pending_map) + len(pending_del)
+        pending_map.clear()
+        pending_del.clear()
+        if queued_rows >= DATA_FLUSH_ROWS:
+            pipe.execute()
+            queued_rows = 0
+
+    # Read-only, tuned, and inside one read transaction for the whole multi-table scan.
+    with _open_ro_sqlite(sqlite_path) as conn:
+        for token in requested:
+            sql_table = _sql_table_for_token(conn, token)
+            n_pk, enc_cols, cur = _select_encoded_rows(conn, token=token, sql_table=sql_table)
+            hkey = data_hash_key(pfx, token)
+            pipe.sadd(reg, hkey)
+            count = 0
+            for row in cur:
+                processed_by_table[token] += 1
+                if max_rows_per_table and processed_by_table[token] > max_rows_per_table:
+                    break
+
+                if None in row[:n_pk]:
+                    raise ApiError("INVALID_INPUT", "primary key is NULL", status_code=422, details={"table": sql_table})
+                row_id = ":".join(map(str, row[:n_pk]))
+                bits_int = encode_row_bits(table=token, row=dict(zip(enc_cols, row[n_pk:])))
+                if not bits_int:
+                    # No bucket matched: no bitset predicate can select the row, so it is not stored.
+                    empty_by_table[token] += 1
+                    pending_del.append(row_id)
+                else:
+                    pending_map[row_id] = int_to_le_bytes(bits_int)
+                    count += 1
+                if len(pending_map) + len(pending_del) >= DATA_BATCH_ROWS:
+                    flush(hkey)
+            if pending_map or pending_del:
+                flush(hkey)
+            created_by_table[token] = count
+
+    counts = {
+        "created_by_table": created_by_table,
+        "processed_by_table": processed_by_table,
+        "empty_by_table": empty_by_table,
+    }
+    # The state key is a registry member, so reset_data_ingest drops it along with the data.
+    pipe.hset(state_key, mapping={"fingerprint": fingerprint, "counts": orjson.dumps(counts)})
+    pipe.sadd(reg, state_key)
+    pipe.execute()
 
     elapsed_ms = int((time.perf_counter() - t0) * 1000)
     return {
         "sqlite": {"ref_path": ref_path, "path": str(sqlite_path)},
         "registry_key": reg,
-        "created_by_table": created_by_table,
-        "processed_by_table": processed_by_table,
+        **counts,
+        "unchanged": False,
         "elapsed_ms": elapsed_ms,
     }
 
 
-def data_info(*, r: redis.Redis, prefix: str, max_keys: int = 50_000) -> dict[str, Any]:
+def data_info(*, r: redis.Redis, prefix: str) -> dict[str, Any]:
     pfx = (prefix or "").strip(":")
     reg = data_registry_key(pfx)
-    counts: dict[str, int] = {}
-    total = 0
-
-    cursor = 0
-    scanned = 0
-    while True:
-        cursor, batch = r.sscan(reg, cursor=cursor, count=2000)
-        for raw_key in batch:
-            scanned += 1
-            if scanned > max_keys:
-                cursor = 0
-                break
-            k = raw_key.decode("utf-8", errors="replace") if isinstance(raw_key, (bytes, bytearray)) else str(raw_key)
-            # {pfx}:data:<Table>:<RowId>
-            want = f"{pfx}:data:"
-            if not k.startswith(want):
-                continue
-            rest = k[len(want) :]
-            if ":" not in rest:
-                continue
-            table, _ = rest.split(":", 1)
-            if not table:
-                continue
-            counts[table] = counts.get(table, 0) + 1
-            total += 1
-        if cursor == 0:
-            break
-
+    # One HLEN per table hash instead of walking every row.
+    pipe = r.pipeline(transaction=False)
+    for token in SUPPORTED_TABLE_TOKENS:
+        pipe.hlen(data_hash_key(pfx, token))
+    counts = {t: int(n) for t, n in zip(SUPPORTED_TABLE_TOKENS, pipe.execute()) if n}
+    total = sum(counts.values())
     return {"registry_key": reg, "total": total, "counts_by_table": dict(sorted(counts.items(), key=lambda kv: kv[0]))}
 
 
@@ -198,36 +257,63 @@ def _sql_where_and_params(*, table: str, conditions: list[dict[str, Any]]) -> tu
     return where, params
 
 
-def _scan_data_keys(
-    *,
-    r: redis.Redis,
-    prefix: str,
-    table: str,
-    max_keys: int,
-) -> list[str]:
-    pfx = (prefix or "").strip(":")
-    t = (table or "").strip()
-    match = f"{pfx}:data:{t}:*"
-    out: list[str] = []
-    for raw in r.scan_iter(match=match, count=2000):
-        k = raw.decode("utf-8", errors="replace") if isinstance(raw, (bytes, bytearray)) else str(raw)
-        if not k:
-            continue
-        out.append(k)
-        if len(out) >= max_keys:
-            break
-    out.sort()
-    return out
-
-
-def _row_id_from_data_key(*, key: str, prefix: str, table: str) -> str | None:
-    pfx = (prefix or "").strip(":")
-    t = (table or "").strip()
-    want = f"{pfx}:data:{t}:"
-    if not key.startswith(want):
-        return None
-    rid = key[len(want) :]
-    return rid if rid else None
+# One HSCAN page of a table's data hash, filtered server-side: keep the row ids whose bitset has
+# every "all"-mask bit and at least one bit of each "any" mask. Values and masks are little-endian
+# bytes, compared byte by byte.
+# KEYS = data hash; ARGV = cursor, COUNT hint, max rows, all-mask, any-mask...
+# Returns { next_cursor, rows_examined, matching_row_ids }.
+FILTER_BITS_LUA = r"""
+local limit = tonumber(ARGV[3])
+
+local function nonzero_bytes(mask)
+  local out = {}
+  for i = 1, #mask do
+    local m = string.byte(mask, i)
+    if m ~= 0 then
+      out[#out + 1] = { i, m }
+    end
+  end
+  return out
+end
+
+local all_req = nonzero_bytes(ARGV[4])
+local any_req = {}
+for a = 5, #ARGV do
+  any_req[#any_req + 1] = nonzero_bytes(ARGV[a])
+end
+
+local function matches(v)
+  for _, p in ipairs(all_req) do
+    if bit.band(string.byte(v, p[1]) or 0, p[2]) ~= p[2] then
+      return false
+    end
+  end
+  for _, req in ipairs(any_req) do
+    local hit = false
+    for _, p in ipairs(req) do
+      if bit.band(string.byte(v, p[1]) or 0, p[2]) ~= 0 then
+        hit = true
+        break
+      end
+    end
+    if not hit then
+      return false
+    end
+  end
+  return true
+end
+
+local page = redis.call("HSCAN", KEYS[1], ARGV[1], "COUNT", ARGV[2])
+local pairs_ = page[2]
+local n = math.min(#pairs_ / 2, limit)
+local matched = {}
+for j = 1, n do
+  if matches(pairs_[2 * j]) then
+    matched[#matched + 1] = pairs_[2 * j - 1]
+  end
+end
+return { page[1], n, matched }
+"""
 
 
 def compare_sql_vs_bitsets(
@@ -252,57 +338,51 @@ def compare_sql_vs_bitsets(
 
     # SQL side
     _, sqlite_path, ref_path = _example_dir_and_sqlite_path()
-    conn = sqlite3.connect(str(sqlite_path))
-    conn.row_factory = sqlite3.Row
-    sql_table = _sql_table_for_token(conn, token)
-    pk_cols = _pk_columns(conn, sql_table)
-    if not pk_cols:
-        raise ApiError("INVALID_INPUT", "table has no primary key", status_code=422, details={"table": token})
+    with _open_ro_sqlite(sqlite_path) as conn:
+        sql_table = _sql_table_for_token(conn, token)
+        pk_cols = _pk_columns(conn, sql_table)
+        if not pk_cols:
+            raise ApiError("INVALID_INPUT", "table has no primary key", status_code=422, details={"table": token})
 
-    where, params = _sql_where_and_params(table=token, conditions=conditions)
-    sel_cols = ", ".join([f'"{c}"' for c in pk_cols])
-    sql_query = f'SELECT {sel_cols} FROM "{sql_table}" WHERE {where}'
-    sql_rows = conn.execute(sql_query, params).fetchall()
-    sql_ids = [_row_pk(row, pk_cols) for row in cast(list[sqlite3.Row], sql_rows)]
+        where, params = _sql_where_and_params(table=token, conditions=conditions)
+        sel_cols = ", ".join(_qident(c) for c in pk_cols)
+        sql_query = f"SELECT {sel_cols} FROM {_qident(sql_table)} WHERE {where}"
+        sql_set = {_row_pk(row, pk_cols) for row in cast(Iterable[sqlite3.Row], conn.execute(sql_query, params))}
 
     # Bitset side
     bit_conds, bit_ref = bit_conditions_for(table=token, conditions=conditions)
-    data_keys = _scan_data_keys(r=r, prefix=pfx, table=token, max_keys=max_scan_keys)
-
-    bitset_ids: list[str] = []
-    batch_size = 400
-    for i in range(0, len(data_keys), batch_size):
-        chunk = data_keys[i : i + batch_size]
-        vals = r.mget(chunk)
-        for j, raw_val in enumerate(vals):
-            if raw_val is None:
-                continue
-            s = raw_val.decode("utf-8", errors="replace") if isinstance(raw_val, (bytes, bytearray)) else str(raw_val)
-            s = (s or "").strip()
-            if not s:
-                continue
-            try:
-                x = int(s, 10)
-            except ValueError:
-                continue
-            ok = True
-            for bc in bit_conds:
-                if bc.kind == "all":
-                    if (x & bc.mask) != bc.mask:
-                        ok = False
-                        break
-                else:
-                    if (x & bc.mask) == 0:
-                        ok = False
-                        break
-            if not ok:
-                continue
-            rid = _row_id_from_data_key(key=chunk[j], prefix=pfx, table=token)
+
+    # AND of "all" conditions is one combined mask test; only "any" conditions need their own test.
+    all_mask = 0
+    any_masks: list[int] = []
+    for bc in bit_conds:
+        if bc.kind == "all":
+            all_mask |= bc.mask
+        else:
+            any_masks.append(bc.mask)
+
+    # Walk the table's hash page by page with the mask test running in Redis, so only matching row
+    # ids cross the wire instead of every row bitset.
+    hkey = data_hash_key(pfx, token)
+    mask_args = [int_to_le_bytes(all_mask), *(int_to_le_bytes(m) for m in any_masks)]
+    filter_page = lua_script(r, FILTER_BITS_LUA)
+    # HSCAN may return a field more than once across pages, so collect into a set.
+    bit_set: set[str] = set()
+    scanned = 0
+    cursor = 0
+    while True:
+        cursor, examined, hits = filter_page(
+            keys=[hkey], args=[cursor, 10_000, max_scan_keys - scanned, *mask_args], client=r
+        )
+        cursor = int(cursor)
+        scanned += int(examined)
+        for raw in hits:
+            rid = raw.decode("utf-8", errors="replace") if isinstance(raw, (bytes, bytearray)) else str(raw)
             if rid:
-                bitset_ids.append(rid)
+                bit_set.add(rid)
+        if cursor == 0 or scanned >= max_scan_keys:
+            break
 
-    sql_set = set(sql_ids)
-    bit_set = set(bitset_ids)
     intersection = sorted(sql_set & bit_set)
     only_sql = sorted(sql_set - bit_set)
     only_bitset = sorted(bit_set - sql_set)
@@ -318,13 +398,13 @@ def compare_sql_vs_bitsets(
         "sql": {"query": sql_query, "params": [str(p) for p in params]},
         "bitset_filter": {"conditions": [bc.label for bc in bit_conds], "bits": bit_ref},
         "results": {
-            "sql": {"count": len(sql_ids), "ids": _sample(sorted(sql_set))},
-            "bitset": {"count": len(bitset_ids), "ids": _sample(sorted(bit_set))},
+            "sql": {"count": len(sql_set), "ids": _sample(sorted(sql_set))},
+            "bitset": {"count": len(bit_set), "ids": _sample(sorted(bit_set))},
             "intersection": {"count": len(intersection), "ids": _sample(intersection)},
             "only_sql": {"count": len(only_sql), "ids": _sample(only_sql)},
             "only_bitset": {"count": len(only_bitset), "ids": _sample(only_bitset)},
         },
-        "scan": {"data_keys_scanned": len(data_keys), "max_scan_keys": max_scan_keys},
+        "scan": {"data_keys_scanned": scanned, "max_scan_keys": max_scan_keys},
         "elapsed_ms": elapsed_ms,
     }
 
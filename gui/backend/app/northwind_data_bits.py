@@ -1,16 +1,18 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 from datetime import date, datetime
 from decimal import Decimal, InvalidOperation
 from typing import Any, Iterable, Literal
 
 from .errors import ApiError
+from .northwind_compare import _qident
 
 # Northwind DATA bit-profile v1 (row-level bitsets)
 #
-# Stored as 4096-bit integers (decimal string) under:
-#   {pfx}:data:<TableName>:<RowId>
+# Stored as 4096-bit integers (raw little-endian bytes, trailing zero bytes trimmed), one hash per table:
+#   {pfx}:data:<TableName>  field <RowId>
 #
 # Layout (coarse):
 # - 0–63        : row/type flags (reserved / optional)
@@ -25,18 +27,30 @@ from .errors import ApiError
 #
 # The UI exposes only predicates that map cleanly to these buckets.
 
+# Bump whenever the bit layout, the encoders or the stored byte format change: it is part of the
+# fingerprint that lets ingest skip a repeat run.
+BIT_PROFILE_VERSION = 1
+
 SUPPORTED_TABLE_TOKENS = ["Customers", "Orders", "OrderDetails", "Products", "Categories"]
 
+# The only columns each table's encoder reads; ingest selects just these (plus the primary key).
+ENCODED_COLUMNS: dict[str, list[str]] = {
+    "Customers": ["Country", "City"],
+    "Orders": ["OrderDate"],
+    "OrderDetails": ["Quantity", "Discount"],
+    "Products": ["CategoryID", "UnitPrice"],
+    "Categories": ["CategoryID"],
+}
+
 
-def data_key(prefix: str, table: str, row_id: str) -> str:
+def data_hash_key(prefix: str, table: str) -> str:
     pfx = (prefix or "").strip(":")
     if not pfx:
         raise ApiError("INVALID_INPUT", "invalid namespace prefix", status_code=422)
     table = (table or "").strip()
-    row_id = (row_id or "").strip()
-    if not table or not row_id:
-        raise ApiError("INVALID_INPUT", "table and row_id are required", status_code=422)
-    return f"{pfx}:data:{table}:{row_id}"
+    if not table:
+        raise ApiError("INVALID_INPUT", "table is required", status_code=422)
+    return f"{pfx}:data:{table}"
 
 
 def data_registry_key(prefix: str) -> str:
@@ -44,6 +58,10 @@ def data_registry_key(prefix: str) -> str:
     return f"{pfx}:import:northwind_compare:data_bits"
 
 
+def data_state_key(prefix: str) -> str:
+    return f"{data_registry_key(prefix)}:state"
+
+
 def _int_from_bits(bits: Iterable[int]) -> int:
     x = 0
     for b in bits:
@@ -57,6 +75,9 @@ def _norm(s: Any) -> str:
     if s is None:
         return ""
     out = str(s).strip()
+    # Printable with no double space means the only whitespace is single ASCII spaces: nothing to collapse.
+    if out.isprintable() and "  " not in out:
+        return out
     out = " ".join(out.split())
     return out
 
@@ -84,7 +105,9 @@ def _parse_decimal(s: Any) -> Decimal | None:
         return None
     if isinstance(s, Decimal):
         return s
-    if isinstance(s, (int, float)):
+    if isinstance(s, int):
+        return Decimal(s)
+    if isinstance(s, float):
         return Decimal(str(s))
     st = _norm(s)
     if not st:
@@ -108,6 +131,27 @@ def _parse_date(s: Any) -> date | None:
     return None
 
 
+# The _parse_date formats with month 01-12 and day 01-31; anything else goes through _parse_date.
+_DATE_RE = re.compile(
+    r"(\d{4})-(0[1-9]|1[0-2])-(0[1-9]|[12]\d|3[01])(?:[ T](?:[01]\d|2[0-3]):[0-5]\d:[0-5]\d)?", re.ASCII
+)
+
+
+def _parse_year(s: Any) -> int | None:
+    m = _DATE_RE.fullmatch(s) if type(s) is str else None
+    if m is None:
+        d = _parse_date(s)
+        return d.year if d is not None else None
+    y, dd = int(m[1]), int(m[3])
+    if dd > 28 or y == 0:
+        # Let date() do the month-length / leap-year check for days 29-31 (and reject year 0).
+        try:
+            date(y, int(m[2]), dd)
+        except ValueError:
+            return None
+    return y
+
+
 # Customers buckets (256+)
 BIT_CUST_COUNTRY_USA = 256
 BIT_CUST_COUNTRY_UK = 257
@@ -153,7 +197,7 @@ def encode_customer_row(row: dict[str, Any]) -> int:
     if b is not None:
         bits.append(b)
 
-    return _int_from_bits(bits)
+    return _fast_int_from_bits(bits)
 
 
 # Products/Categories buckets (1024+)
@@ -187,7 +231,7 @@ def encode_product_row(row: dict[str, Any]) -> int:
     if pb is not None:
         bits.append(pb)
 
-    return _int_from_bits(bits)
+    return _fast_int_from_bits(bits)
 
 
 def encode_category_row(row: dict[str, Any]) -> int:
@@ -195,7 +239,7 @@ def encode_category_row(row: dict[str, Any]) -> int:
     cat_id = _parse_int(row.get("CategoryID"))
     if cat_id is not None and 1 <= cat_id <= 32:
         bits.append(BIT_PROD_CATEGORY_BASE + (cat_id - 1))
-    return _int_from_bits(bits)
+    return _fast_int_from_bits(bits)
 
 
 # Orders / OrderDetails buckets (1792+)
@@ -205,25 +249,24 @@ BIT_ORD_YEAR_1998 = 1794
 BIT_ORD_YEAR_OTHER = 1795
 
 
-def _order_year_bit(d: date | None) -> int | None:
-    if d is None:
+def _order_year_bit(year: int | None) -> int | None:
+    if year is None:
         return None
-    if d.year == 1996:
+    if year == 1996:
         return BIT_ORD_YEAR_1996
-    if d.year == 1997:
+    if year == 1997:
         return BIT_ORD_YEAR_1997
-    if d.year == 1998:
+    if year == 1998:
         return BIT_ORD_YEAR_1998
     return BIT_ORD_YEAR_OTHER
 
 
 def encode_order_row(row: dict[str, Any]) -> int:
     bits: list[int] = []
-    d = _parse_date(row.get("OrderDate"))
-    yb = _order_year_bit(d)
+    yb = _order_year_bit(_parse_year(row.get("OrderDate")))
     if yb is not None:
         bits.append(yb)
-    return _int_from_bits(bits)
+    return _fast_int_from_bits(bits)
 
 
 BIT_OD_QTY_LT_5 = 1856
@@ -256,7 +299,40 @@ def encode_order_details_row(row: dict[str, Any]) -> int:
     if disc is not None and disc > 0:
         bits.append(BIT_OD_DISCOUNT_GT_0)
 
-    return _int_from_bits(bits)
+    return _fast_int_from_bits(bits)
+
+
+# 1 << b for exactly the bits the encoders above can emit. Encoders only ever pass these
+# constants, so they skip the per-bit range check that _int_from_bits does for user input.
+_BIT_VALUES: dict[int, int] = {
+    b: 1 << b
+    for b in (
+        *COUNTRY_BITS.values(),
+        BIT_CUST_COUNTRY_OTHER,
+        *CITY_BITS.values(),
+        *range(BIT_PROD_CATEGORY_BASE, BIT_PROD_CATEGORY_BASE + 32),
+        BIT_PROD_PRICE_LT_10,
+        BIT_PROD_PRICE_10_20,
+        BIT_PROD_PRICE_20_50,
+        BIT_PROD_PRICE_GE_50,
+        BIT_ORD_YEAR_1996,
+        BIT_ORD_YEAR_1997,
+        BIT_ORD_YEAR_1998,
+        BIT_ORD_YEAR_OTHER,
+        BIT_OD_QTY_LT_5,
+        BIT_OD_QTY_5_10,
+        BIT_OD_QTY_11_20,
+        BIT_OD_QTY_GT_20,
+        BIT_OD_DISCOUNT_GT_0,
+    )
+}
+
+
+def _fast_int_from_bits(bits: list[int]) -> int:
+    x = 0
+    for b in bits:
+        x |= _BIT_VALUES[b]
+    return x
 
 
 def encode_row_bits(*, table: str, row: dict[str, Any]) -> int:
@@ -294,7 +370,7 @@ def sql_expr_for(*, table: str, column: str) -> str:
     if t == "Orders" and col == "OrderYear":
         # SQLite: year from OrderDate.
         return 'CAST(strftime(\'%Y\', "OrderDate") AS INTEGER)'
-    return f'"{col}"'
+    return _qident(col)
 
 
 def bit_conditions_for(*, table: str, conditions: list[dict[str, Any]]) -> tuple[list[BitCondition], list[int]]:
@@ -1,7 +1,63 @@
 from __future__ import annotations
 
+import ctypes
+import os
+import struct
+import threading
+from typing import Callable
+
+import redis
+from redis.commands.core import Script
+
 from .errors import ApiError
 
+# One Script per Lua source for the whole process. Script hashes the source once and runs
+# EVALSHA against whichever client is passed at call time, reloading on NOSCRIPT (e.g. after
+# SCRIPT FLUSH or a Redis restart), so callers must always pass client=.
+_SCRIPTS: dict[str, Script] = {}
+
+
+def lua_script(r: redis.Redis, source: str) -> Script:
+    script = _SCRIPTS.get(source)
+    if script is None:
+        script = _SCRIPTS[source] = r.register_script(source)
+    return script
+
+
+def int_to_le_bytes(x: int) -> bytes:
+    # Stored bitsets: raw little-endian bytes with trailing zero bytes trimmed (at least one byte).
+    # Most values set a handful of low-ish bits, so this is a few hundred bytes at most versus
+    # ~1.2 KB for a 4096-bit decimal string, with no quadratic int<->str conversion.
+    return x.to_bytes(max(1, (x.bit_length() + 7) // 8), "little")
+
+
+_FLAGS_WORDS = struct.Struct("<64Q")
+
+
+def _load_abi_decoder() -> Callable[..., int] | None:
+    # Optional native decoder from liber_abi.so (built with the C++ core); set ER_ABI_LIB to its path.
+    path = os.getenv("ER_ABI_LIB", "").strip()
+    if not path:
+        return None
+    try:
+        fn = ctypes.CDLL(path).er_decode_flags_bin
+    except (OSError, AttributeError):
+        return None
+    fn.argtypes = [
+        ctypes.c_char_p,
+        ctypes.c_size_t,
+        ctypes.POINTER(ctypes.c_uint16),
+        ctypes.c_size_t,
+        ctypes.POINTER(ctypes.c_size_t),
+    ]
+    fn.restype = ctypes.c_int
+    return fn
+
+
+_abi_decode = _load_abi_decoder()
+# Per-thread output buffers for the native decoder (routes may run in the threadpool).
+_abi_bufs = threading.local()
+
 
 def decode_flags_bin(flags_bin: bytes) -> list[int]:
     if len(flags_bin) != 512:
@@ -12,15 +68,25 @@ def decode_flags_bin(flags_bin: bytes) -> list[int]:
             details={"len": len(flags_bin)},
         )
 
+    if _abi_decode is not None:
+        out = getattr(_abi_bufs, "out", None)
+        if out is None:
+            out = _abi_bufs.out = (ctypes.c_uint16 * 4096)()
+            _abi_bufs.n = ctypes.c_size_t()
+        n = _abi_bufs.n
+        if _abi_decode(bytes(flags_bin), 512, out, 4096, ctypes.byref(n)) == 0:
+            return out[: n.value]
+
+    # Byte i holds bits (511 - i) * 8 .. + 7, so the reversed buffer is 64 little-endian words with
+    # word w holding bits w * 64 .. + 63. Zero words cost one test; set bits are peeled off lowest first.
     bits: list[int] = []
-    for i in range(511, -1, -1):
-        byte = flags_bin[i]
-        if byte == 0:
-            continue
-        base = (511 - i) * 8
-        for b in range(8):
-            if byte & (1 << b):
-                bits.append(base + b)
+    base = -64
+    for w in _FLAGS_WORDS.unpack(flags_bin[::-1]):
+        base += 64
+        while w:
+            low = w & -w
+            bits.append(base + low.bit_length() - 1)
+            w ^= low
     return bits
 
 
@@ -62,14 +62,13 @@ BIT_UPD_RESTRICT = 1055
 
 
 def encode_flags_bin(bits: Iterable[int]) -> bytes:
-    buf = bytearray(512)
+    # Bit b lives in byte 511 - b // 8 at position b % 8, i.e. the 4096-bit big-endian integer.
+    x = 0
     for b in bits:
         if not isinstance(b, int) or b < 0 or b > 4095:
             raise ApiError("INVALID_BIT", "bit must be 0..4095", status_code=422, details={"bit": b})
-        byte_from_end = b // 8
-        i = 511 - byte_from_end
-        buf[i] |= 1 << (b % 8)
-    return bytes(buf)
+        x |= 1 << b
+    return x.to_bytes(512, "big")
 
 
 @dataclass(frozen=True)
@@ -93,13 +92,34 @@ class DecodedRelationMeta:
 
 _LEN_RE = re.compile(r"\((\s*\d+\s*)\)")
 
+# First match wins, so order matters (e.g. "POINT" is INTEGER, "DATETEXT" is TEXT).
+# VARCHAR is covered by CHAR.
+_FAMILY_SUBSTRINGS: tuple[tuple[str, int], ...] = (
+    ("INT", BIT_TYPE_INTEGER),
+    ("CHAR", BIT_TYPE_TEXT),
+    ("CLOB", BIT_TYPE_TEXT),
+    ("TEXT", BIT_TYPE_TEXT),
+    ("REAL", BIT_TYPE_REAL),
+    ("FLOA", BIT_TYPE_REAL),
+    ("DOUB", BIT_TYPE_REAL),
+    ("DATE", BIT_TYPE_DATETIME),
+    ("TIME", BIT_TYPE_DATETIME),
+    ("BLOB", BIT_TYPE_BLOB),
+    ("NUMERIC", BIT_TYPE_NUMERIC),
+    ("DECIMAL", BIT_TYPE_NUMERIC),
+    ("BOOLEAN", BIT_TYPE_NUMERIC),
+)
+
 
 def _normalize_declared_type(declared_type: str) -> str:
     return " ".join((declared_type or "").strip().upper().split())
 
 
 def sqlite_type_family_bits(declared_type: str) -> tuple[int | None, int | None]:
-    t = _normalize_declared_type(declared_type)
+    return _family_bits_from_norm(_normalize_declared_type(declared_type))
+
+
+def _family_bits_from_norm(t: str) -> tuple[int | None, int | None]:
     length: int | None = None
     m = _LEN_RE.search(t)
     if m:
@@ -108,26 +128,20 @@ def sqlite_type_family_bits(declared_type: str) -> tuple[int | None, int | None]
         except ValueError:
             length = None
 
-    if "INT" in t:
-        return BIT_TYPE_INTEGER, length
-    if any(x in t for x in ("CHAR", "CLOB", "TEXT", "VARCHAR")):
-        return BIT_TYPE_TEXT, length
-    if any(x in t for x in ("REAL", "FLOA", "DOUB")):
-        return BIT_TYPE_REAL, length
-    if any(x in t for x in ("DATE", "TIME")):
-        return BIT_TYPE_DATETIME, length
-    if "BLOB" in t:
-        return BIT_TYPE_BLOB, length
-    if any(x in t for x in ("NUMERIC", "DECIMAL", "BOOLEAN")):
-        return BIT_TYPE_NUMERIC, length
+    for sub, family_bit in _FAMILY_SUBSTRINGS:
+        if sub in t:
+            return family_bit, length
     return None, length
 
 
 def sqlite_length_bucket_bits(*, declared_type: str, family_bit: int | None, length: int | None) -> int | None:
+    return _length_bucket_from_norm(_normalize_declared_type(declared_type), family_bit=family_bit, length=length)
+
+
+def _length_bucket_from_norm(t: str, *, family_bit: int | None, length: int | None) -> int | None:
     if family_bit not in (BIT_TYPE_TEXT, BIT_TYPE_BLOB, BIT_TYPE_NUMERIC, BIT_TYPE_REAL, BIT_TYPE_INTEGER, BIT_TYPE_DATETIME):
         return None
 
-    t = _normalize_declared_type(declared_type)
     is_sized = "(" in t and ")" in t
     if length is None and not is_sized:
         if family_bit == BIT_TYPE_TEXT:
@@ -145,8 +159,42 @@ def sqlite_length_bucket_bits(*, declared_type: str, family_bit: int | None, len
     return BIT_LEN_HUGE
 
 
-def bits_for_table() -> set[int]:
-    return {BIT_IS_TABLE, BIT_TABLE_META}
+# declared_type -> its family / length-bucket bits; schemas repeat a handful of declared types.
+_COLUMN_TYPE_BITS: dict[str, frozenset[int]] = {}
+
+
+def _column_type_bits(declared_type: str) -> frozenset[int]:
+    cached = _COLUMN_TYPE_BITS.get(declared_type)
+    if cached is None:
+        t = _normalize_declared_type(declared_type)
+        family_bit, length = _family_bits_from_norm(t)
+        len_bit = _length_bucket_from_norm(t, family_bit=family_bit, length=length)
+        cached = frozenset(b for b in (family_bit, len_bit) if b is not None)
+        _COLUMN_TYPE_BITS[declared_type] = cached
+    return cached
+
+
+_TABLE_BITS = frozenset({BIT_IS_TABLE, BIT_TABLE_META})
+
+# (not_null, has_default, is_pk, is_fk, has_index) -> every non-type column bit.
+_COLUMN_FLAG_BITS: dict[tuple[bool, bool, bool, bool, bool], frozenset[int]] = {
+    (nn, hd, pk, fk, idx): frozenset(
+        {BIT_IS_COLUMN, BIT_COLUMN_META, BIT_NOT_NULL if nn else BIT_NULL_ALLOWED}
+        | ({BIT_HAS_DEFAULT} if hd else set())
+        | ({BIT_PART_OF_PK} if pk else set())
+        | ({BIT_PART_OF_FK} if fk else set())
+        | ({BIT_HAS_INDEX} if idx else set())
+    )
+    for nn in (False, True)
+    for hd in (False, True)
+    for pk in (False, True)
+    for fk in (False, True)
+    for idx in (False, True)
+}
+
+
+def bits_for_table() -> frozenset[int]:
+    return _TABLE_BITS
 
 
 def bits_for_column(
@@ -157,25 +205,9 @@ def bits_for_column(
     is_pk: bool,
     is_fk: bool,
     has_index: bool,
-) -> set[int]:
-    bits: set[int] = {BIT_IS_COLUMN, BIT_COLUMN_META}
-    family_bit, length = sqlite_type_family_bits(declared_type)
-    if family_bit is not None:
-        bits.add(family_bit)
-    len_bit = sqlite_length_bucket_bits(declared_type=declared_type, family_bit=family_bit, length=length)
-    if len_bit is not None:
-        bits.add(len_bit)
-
-    bits.add(BIT_NOT_NULL if not_null else BIT_NULL_ALLOWED)
-    if has_default:
-        bits.add(BIT_HAS_DEFAULT)
-    if is_pk:
-        bits.add(BIT_PART_OF_PK)
-    if is_fk:
-        bits.add(BIT_PART_OF_FK)
-    if has_index:
-        bits.add(BIT_HAS_INDEX)
-    return bits
+) -> frozenset[int]:
+    flags = _COLUMN_FLAG_BITS[(bool(not_null), bool(has_default), bool(is_pk), bool(is_fk), bool(has_index))]
+    return flags | _column_type_bits(declared_type)
 
 
 def _is_restrict(action: str) -> bool:
@@ -183,18 +215,28 @@ def _is_restrict(action: str) -> bool:
     return not a or a in ("RESTRICT", "NO ACTION", "SET DEFAULT")
 
 
+# (is_unique_child, child_mandatory, ON DELETE, ON UPDATE) -> relation bits, filled on first use.
+_RELATION_BITS: dict[tuple[bool, bool, str, str], frozenset[int]] = {}
+
+
 def bits_for_relation(
     *,
     is_unique_child: bool,
     child_mandatory: bool,
     on_delete: str,
     on_update: str,
-) -> set[int]:
+) -> frozenset[int]:
+    od = (on_delete or "").strip().upper()
+    ou = (on_update or "").strip().upper()
+    key = (bool(is_unique_child), bool(child_mandatory), od, ou)
+    cached = _RELATION_BITS.get(key)
+    if cached is not None:
+        return cached
+
     bits: set[int] = {BIT_IS_FK_REL, BIT_REL_META, BIT_RELATION}
     bits.add(BIT_CARD_1_1 if is_unique_child else BIT_CARD_1_N)
     bits.add(BIT_CHILD_MANDATORY if child_mandatory else BIT_CHILD_OPTIONAL)
 
-    od = (on_delete or "").strip().upper()
     if od == "CASCADE":
         bits.add(BIT_DEL_CASCADE)
     elif od == "SET NULL":
@@ -202,7 +244,6 @@ def bits_for_relation(
     elif _is_restrict(od):
         bits.add(BIT_DEL_RESTRICT)
 
-    ou = (on_update or "").strip().upper()
     if ou == "CASCADE":
         bits.add(BIT_UPD_CASCADE)
     elif ou == "SET NULL":
@@ -210,69 +251,63 @@ def bits_for_relation(
     elif _is_restrict(ou):
         bits.add(BIT_UPD_RESTRICT)
 
-    return bits
+    cached = _RELATION_BITS[key] = frozenset(bits)
+    return cached
+
+
+# Mutually exclusive bit groups, in decode priority order: the first bit present wins.
+_FAMILY_NAMES: tuple[tuple[int, str], ...] = (
+    (BIT_TYPE_TEXT, "TEXT"),
+    (BIT_TYPE_INTEGER, "INTEGER"),
+    (BIT_TYPE_REAL, "REAL"),
+    (BIT_TYPE_NUMERIC, "NUMERIC"),
+    (BIT_TYPE_DATETIME, "DATETIME"),
+    (BIT_TYPE_BLOB, "BLOB"),
+)
+_LENGTH_NAMES: tuple[tuple[int, str], ...] = (
+    (BIT_LEN_SMALL, "small"),
+    (BIT_LEN_MEDIUM, "medium"),
+    (BIT_LEN_LARGE, "large"),
+    (BIT_LEN_HUGE, "huge"),
+)
+_ON_DELETE_NAMES: tuple[tuple[int, str], ...] = (
+    (BIT_DEL_CASCADE, "CASCADE"),
+    (BIT_DEL_SET_NULL, "SET NULL"),
+    (BIT_DEL_RESTRICT, "RESTRICT"),
+)
+_ON_UPDATE_NAMES: tuple[tuple[int, str], ...] = (
+    (BIT_UPD_CASCADE, "CASCADE"),
+    (BIT_UPD_SET_NULL, "SET NULL"),
+    (BIT_UPD_RESTRICT, "RESTRICT"),
+)
+
+
+def _first_name(bits: set[int], names: tuple[tuple[int, str], ...]) -> str | None:
+    for bit, name in names:
+        if bit in bits:
+            return name
+    return None
 
 
 def decode_column_meta(bits: set[int]) -> DecodedColumnMeta:
-    family = (
-        "TEXT"
-        if BIT_TYPE_TEXT in bits
-        else "INTEGER"
-        if BIT_TYPE_INTEGER in bits
-        else "REAL"
-        if BIT_TYPE_REAL in bits
-        else "NUMERIC"
-        if BIT_TYPE_NUMERIC in bits
-        else "DATETIME"
-        if BIT_TYPE_DATETIME in bits
-        else "BLOB"
-        if BIT_TYPE_BLOB in bits
-        else None
-    )
     not_null = True if BIT_NOT_NULL in bits else False if BIT_NULL_ALLOWED in bits else None
-    length_bucket = (
-        "small"
-        if BIT_LEN_SMALL in bits
-        else "medium"
-        if BIT_LEN_MEDIUM in bits
-        else "large"
-        if BIT_LEN_LARGE in bits
-        else "huge"
-        if BIT_LEN_HUGE in bits
-        else None
-    )
     return DecodedColumnMeta(
-        type_family=family,
+        type_family=_first_name(bits, _FAMILY_NAMES),
         not_null=not_null,
         has_default=(BIT_HAS_DEFAULT in bits),
         is_pk=(BIT_PART_OF_PK in bits),
         is_fk=(BIT_PART_OF_FK in bits),
         has_index=(BIT_HAS_INDEX in bits),
-        length_bucket=length_bucket,
+        length_bucket=_first_name(bits, _LENGTH_NAMES),
     )
 
 
 def decode_relation_meta(bits: set[int]) -> DecodedRelationMeta:
     card = "1:1" if BIT_CARD_1_1 in bits else "1:N" if BIT_CARD_1_N in bits else None
     required = True if BIT_CHILD_MANDATORY in bits else False if BIT_CHILD_OPTIONAL in bits else None
-
-    on_delete = (
-        "CASCADE"
-        if BIT_DEL_CASCADE in bits
-        else "SET NULL"
-        if BIT_DEL_SET_NULL in bits
-        else "RESTRICT"
-        if BIT_DEL_RESTRICT in bits
-        else None
-    )
-    on_update = (
-        "CASCADE"
-        if BIT_UPD_CASCADE in bits
-        else "SET NULL"
-        if BIT_UPD_SET_NULL in bits
-        else "RESTRICT"
-        if BIT_UPD_RESTRICT in bits
-        else None
+    return DecodedRelationMeta(
+        cardinality=card,
+        child_required=required,
+        on_delete=_first_name(bits, _ON_DELETE_NAMES),
+        on_update=_first_name(bits, _ON_UPDATE_NAMES),
     )
-    return DecodedRelationMeta(cardinality=card, child_required=required, on_delete=on_delete, on_update=on_update)
-
@@ -34,6 +34,7 @@ class Settings(BaseSettings):
 
     redis_host: str = Field(default="redis", validation_alias=AliasChoices("ER_REDIS_HOST", "REDIS_HOST"))
     redis_port: int = Field(default=6379, validation_alias=AliasChoices("ER_REDIS_PORT", "REDIS_PORT"))
+    redis_socket: str = Field(default="", validation_alias=AliasChoices("ER_REDIS_SOCKET", "REDIS_SOCKET"))
 
     er_cli_path: str = Field(default="/usr/local/bin/er_cli", validation_alias=AliasChoices("ER_CLI_PATH"))
 
@@ -44,8 +45,21 @@ class Settings(BaseSettings):
     ttl_max_sec: int = Field(default=86400, validation_alias=AliasChoices("ER_GUI_TTL_MAX_SEC"))
 
 
+_loaded: tuple[Settings, Path | None] | None = None
+
+
 def load_settings() -> tuple[Settings, Path | None]:
+    # Resolved once per process: the preset file is read and Settings validated on first use only.
+    global _loaded
+    if _loaded is None:
+        _loaded = reload_settings()
+    return _loaded
+
+
+def reload_settings() -> tuple[Settings, Path | None]:
+    global _loaded
     preset = os.getenv("GUI_PRESET", "default")
     presets_dir = os.getenv("ER_GUI_PRESETS_DIR", "/app/presets")
     preset_path = apply_preset_env(preset=preset, presets_dir=presets_dir)
-    return Settings(), preset_path
+    _loaded = (Settings(), preset_path)
+    return _loaded
@@ -1,5 +1,5 @@
 #!/usr/bin/env sh
 set -eu
 
-exec uvicorn app.main:app --host 0.0.0.0 --port 8000
+exec uvicorn app.main:app --host 0.0.0.0 --port 8000 --loop uvloop --http httptools
 
@@ -49,6 +49,10 @@ ER_ABI_API int er_find_all_store(er_handle_t* h, int ttl_sec,
 ER_ABI_API int er_show_set(er_handle_t* h, const char* set_key,
                            char* out, size_t out_cap);
 
+/* decode a 512-byte big-endian flags_bin into ascending bit indexes (no handle/Redis needed) */
+ER_ABI_API int er_decode_flags_bin(const uint8_t* buf, size_t len,
+                                   uint16_t* out_bits, size_t cap, size_t* out_n);
+
 int er_find_any_store(er_handle_t* h, int ttl_seconds,
                       const uint16_t* bits, size_t n_bits,
                       char* out_tmp_key, size_t key_cap);
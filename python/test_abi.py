@@ -1,4 +1,6 @@
 import ctypes as C
+import random
+import struct
 from ctypes import c_char_p, c_int, c_size_t, c_uint16, POINTER
 
 lib = C.CDLL("./build/liber_abi.so")
@@ -21,6 +23,30 @@ lib.er_find_all_store.restype = c_int
 lib.er_show_set.argtypes = [C.c_void_p, c_char_p, c_char_p, c_size_t]
 lib.er_show_set.restype = c_int
 
+lib.er_decode_flags_bin.argtypes = [c_char_p, c_size_t, POINTER(c_uint16), c_size_t, POINTER(c_size_t)]
+lib.er_decode_flags_bin.restype = c_int
+
+
+def decode_flags_bin_py(buf):
+    # Reference decoder (same as gui/backend/app/redis_bits.py): the reversed 512-byte big-endian
+    # buffer is 64 little-endian words, word w holding bits w*64 .. w*64+63.
+    bits = []
+    for w, word in enumerate(struct.unpack("<64Q", buf[::-1])):
+        bits += [w * 64 + i for i in range(64) if word >> i & 1]
+    return bits
+
+
+rng = random.Random(0)
+cases = [bytes(512), b"\xff" * 512, (1).to_bytes(512, "big"), (1 << 4095).to_bytes(512, "big")]
+cases += [sum(1 << b for b in rng.sample(range(4096), rng.randint(1, 200))).to_bytes(512, "big") for _ in range(200)]
+dec_out = (c_uint16 * 4096)()
+dec_n = c_size_t()
+for buf in cases:
+    assert lib.er_decode_flags_bin(buf, len(buf), dec_out, 4096, C.byref(dec_n)) == 0
+    assert dec_out[: dec_n.value] == decode_flags_bin_py(buf)
+assert lib.er_decode_flags_bin(cases[1], 512, dec_out, 10, C.byref(dec_n)) == 3  # ER_RANGE
+assert lib.er_decode_flags_bin(cases[1], 511, dec_out, 4096, C.byref(dec_n)) == 2  # ER_BADARG
+
 h = lib.er_create(b"redis", 6379)
 assert h
 assert lib.er_ping(h) == 0
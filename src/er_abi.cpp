@@ -6,6 +6,8 @@
 #include <memory>
 #include <cstring>
 #include <chrono>
+#include <bit>
+#include <cstdint>
 
 #include "er/RedisClient.hpp"
 #include "er/Flags4096.hpp"
@@ -193,6 +195,28 @@ int er_show_set(er_handle_t* h, const char* set_key,
     std::memcpy(out, s.c_str(), s.size() + 1);
     return ER_OK;
 }
+
+/* flags_bin codec */
+int er_decode_flags_bin(const uint8_t* buf, size_t len,
+                        uint16_t* out_bits, size_t cap, size_t* out_n) {
+    if (!buf || len != 512 || (!out_bits && cap > 0) || !out_n)
+        return ER_BADARG;
+
+    // byte 511 - j holds bits j*8 .. j*8+7, so word i (bits i*64 ..) is bytes 511-8i .. 504-8i
+    size_t n = 0;
+    for (size_t i = 0; i < 64; ++i) {
+        std::uint64_t w = 0;
+        for (size_t k = 0; k < 8; ++k)
+            w |= static_cast<std::uint64_t>(buf[511 - (i * 8 + k)]) << (8 * k);
+        while (w) {
+            if (n >= cap) return ER_RANGE;
+            out_bits[n++] = static_cast<uint16_t>(i * 64 + std::countr_zero(w));
+            w &= w - 1;
+        }
+    }
+    *out_n = n;
+    return ER_OK;
+}
     
 int er_find_any_store(er_handle_t* h, int ttl_seconds,
                       const uint16_t* bits, size_t n_bits,
@@ -2,10 +2,12 @@
 from __future__ import annotations
 
 import argparse
-import json
 import time
-from typing import Iterable
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Iterable
 
+import orjson
 import redis
 
 
@@ -45,6 +47,9 @@ DOMAIN_BITS: dict[str, int] = {
 }
 
 
+WN_POS_PARTITIONS = ("n", "v", "a", "r")
+
+
 def wn_dict_key(synset: str) -> str:
     return f"wn:dict:{synset}"
 
@@ -70,7 +75,28 @@ def int_from_bits(bits: Iterable[int]) -> int:
     return x
 
 
-def domain_bits_for_lexname(lexname: str) -> list[str]:
+# Leading format byte of wn:dict:* values; must match WN_DICT_TAG in gui/backend/app/assoc_wordnet.py.
+WN_DICT_TAG = b"\x01"
+
+
+def int_to_le_bytes(x: int) -> bytes:
+    # Same encoding as gui/backend/app/redis_bits.py int_to_le_bytes (raw little-endian bytes,
+    # trailing zero bytes trimmed, at least one byte).
+    return x.to_bytes(max(1, (x.bit_length() + 7) // 8), "little")
+
+
+# WordNet has only ~45 lexnames, so each is classified once.
+_DOMAINS_BY_LEXNAME: dict[str, tuple[str, ...]] = {}
+
+
+def domain_bits_for_lexname(lexname: str) -> tuple[str, ...]:
+    cached = _DOMAINS_BY_LEXNAME.get(lexname)
+    if cached is None:
+        cached = _DOMAINS_BY_LEXNAME[lexname] = _domains_for_lexname(lexname)
+    return cached
+
+
+def _domains_for_lexname(lexname: str) -> tuple[str, ...]:
     lx = (lexname or "").strip().lower()
     out: list[str] = []
     if "food" in lx:
@@ -98,7 +124,7 @@ def domain_bits_for_lexname(lexname: str) -> list[str]:
         out.append("ABSTRACT")
     # de-dupe, stable order by bit index
     uniq = sorted(set(out), key=lambda d: DOMAIN_BITS.get(d, 9999))
-    return uniq
+    return tuple(uniq)
 
 
 def reset_keys(r: redis.Redis) -> None:
@@ -119,44 +145,27 @@ def reset_keys(r: redis.Redis) -> None:
     print(f"reset: deleted~={deleted} keys")
 
 
-def main() -> int:
-    ap = argparse.ArgumentParser(description="Ingest NLTK WordNet → Redis (wn:dict:* bitsets + metadata)")
-    ap.add_argument("--redis-host", default="127.0.0.1")
-    ap.add_argument("--redis-port", type=int, default=6379)
-    ap.add_argument("--redis-db", type=int, default=0)
-    ap.add_argument("--reset", action="store_true", help="Delete existing wn:* keys before ingest")
-    ap.add_argument("--limit", type=int, default=0, help="Ingest only first N synsets (debug)")
-    ap.add_argument("--batch", type=int, default=2000, help="Pipeline batch size")
-    args = ap.parse_args()
-
-    r = redis.Redis(host=args.redis_host, port=args.redis_port, db=args.redis_db, decode_responses=False)
-    r.ping()
-
-    if args.reset:
-        reset_keys(r)
-
-    import nltk  # type: ignore
-    from nltk.corpus import wordnet as wn  # type: ignore
-
-    try:
-        wn.synsets("dog")
-    except LookupError:
-        nltk.download("wordnet")
-        nltk.download("omw-1.4")
-
+def ingest_synsets(r: redis.Redis, synsets: Iterable[Any], *, batch: int, limit: int = 0, label: str = "") -> int:
     t0 = time.perf_counter()
     pipe = r.pipeline(transaction=False)
     queued = 0
     count = 0
+    # Per flush: one MSET for all dict/meta/rels strings and one variadic SADD per index/lemma set.
+    mset_buf: dict[str, str | bytes] = {}
+    sadd_buf: defaultdict[str, list[str]] = defaultdict(list)
 
     def flush() -> None:
-        nonlocal queued, pipe
+        nonlocal queued
         if queued:
+            pipe.mset(mset_buf)
+            for k, members in sadd_buf.items():
+                pipe.sadd(k, *members)
             pipe.execute()
-            pipe = r.pipeline(transaction=False)
+            mset_buf.clear()
+            sadd_buf.clear()
             queued = 0
 
-    for syn in wn.all_synsets():
+    for syn in synsets:
         syn_id = syn.name()
         pos = syn.pos()
         bits: list[int] = []
@@ -169,36 +178,45 @@ def main() -> int:
         elif pos == "r":
             bits.append(BIT_POS_ADV)
 
-        lemma_names = [str(x) for x in syn.lemma_names() if str(x).strip()]
-        lemma_norm = [_norm(x) for x in lemma_names]
-        lemma_norm = [x for x in lemma_norm if x]
-        lemma = lemma_norm[0] if lemma_norm else _norm(syn_id.split(".", 1)[0])
-
-        if any((" " in ln) for ln in lemma_norm):
+        # Distinct normalized lemmas in first-seen order, in a single pass.
+        lemma_seen: dict[str, None] = {}
+        has_multiword = False
+        for x in syn.lemma_names():
+            ln = _norm(str(x))
+            if ln:
+                has_multiword = has_multiword or " " in ln
+                lemma_seen[ln] = None
+        lemma = next(iter(lemma_seen), None) or _norm(syn_id.split(".", 1)[0])
+        lemmas_sorted = sorted(lemma_seen)
+
+        if has_multiword:
             bits.append(BIT_MULTIWORD)
 
-        if len(set(lemma_norm)) > 1:
+        if len(lemma_seen) > 1:
             bits.append(BIT_REL_SYNONYM)
 
-        if syn.hypernyms():
+        # Each NLTK relation getter builds a fresh list; fetch once for both the bits and rels.
+        hypernyms = syn.hypernyms()
+        hyponyms = syn.hyponyms()
+        meronyms = syn.part_meronyms() + syn.substance_meronyms() + syn.member_meronyms()
+        holonyms = syn.part_holonyms() + syn.substance_holonyms() + syn.member_holonyms()
+        entailments = syn.entailments()
+        similar_tos = syn.similar_tos()
+        lemma_antonyms = [a for lem in syn.lemmas() for a in lem.antonyms()]
+
+        if hypernyms:
             bits.append(BIT_REL_HYPERNYM)
-        if syn.hyponyms():
+        if hyponyms:
             bits.append(BIT_REL_HYPONYM)
-        if syn.part_meronyms() or syn.substance_meronyms() or syn.member_meronyms():
+        if meronyms:
             bits.append(BIT_REL_MERONYM)
-        if syn.part_holonyms() or syn.substance_holonyms() or syn.member_holonyms():
+        if holonyms:
             bits.append(BIT_REL_HOLONYM)
-        if syn.entailments():
+        if entailments:
             bits.append(BIT_REL_ENTAILMENT)
-        if syn.similar_tos():
+        if similar_tos:
             bits.append(BIT_REL_SIMILAR_TO)
-
-        has_ant = False
-        for lem in syn.lemmas():
-            if lem.antonyms():
-                has_ant = True
-                break
-        if has_ant:
+        if lemma_antonyms:
             bits.append(BIT_REL_ANTONYM)
 
         lexname = ""
@@ -213,63 +231,106 @@ def main() -> int:
                 bits.append(b)
 
         rels = {
-            "hypernyms": [s.name() for s in syn.hypernyms()],
-            "hyponyms": [s.name() for s in syn.hyponyms()],
-            "meronyms": [s.name() for s in (syn.part_meronyms() + syn.substance_meronyms() + syn.member_meronyms())],
-            "holonyms": [s.name() for s in (syn.part_holonyms() + syn.substance_holonyms() + syn.member_holonyms())],
-            "entailments": [s.name() for s in syn.entailments()],
-            "similar_tos": [s.name() for s in syn.similar_tos()],
+            "hypernyms": [s.name() for s in hypernyms],
+            "hyponyms": [s.name() for s in hyponyms],
+            "meronyms": [s.name() for s in meronyms],
+            "holonyms": [s.name() for s in holonyms],
+            "entailments": [s.name() for s in entailments],
+            "similar_tos": [s.name() for s in similar_tos],
             "antonyms": [],
         }
         ants = set()
-        for lem in syn.lemmas():
-            for a in lem.antonyms():
-                try:
-                    ants.add(a.synset().name())
-                except Exception:
-                    continue
+        for a in lemma_antonyms:
+            try:
+                ants.add(a.synset().name())
+            except Exception:
+                continue
         rels["antonyms"] = sorted(ants)
 
         bits_int = int_from_bits(bits)
 
-        pipe.set(wn_dict_key(syn_id), str(bits_int))
-        pipe.set(
-            wn_meta_key(syn_id),
-            json.dumps(
-                {
-                    "synset": syn_id,
-                    "lemma": lemma,
-                    "lemmas": sorted(set(lemma_norm))[:32],
-                    "lexname": lexname,
-                    "domains": domains,
-                    "primary_domain": domains[0] if domains else None,
-                    "pos": pos,
-                },
-                ensure_ascii=False,
-                separators=(",", ":"),
-            ),
+        mset_buf[wn_dict_key(syn_id)] = WN_DICT_TAG + int_to_le_bytes(bits_int)
+        mset_buf[wn_meta_key(syn_id)] = orjson.dumps(
+            {
+                "synset": syn_id,
+                "lemma": lemma,
+                "lemmas": lemmas_sorted[:32],
+                "lexname": lexname,
+                "domains": domains,
+                "primary_domain": domains[0] if domains else None,
+                "pos": pos,
+            }
         )
-        pipe.set(wn_rels_key(syn_id), json.dumps(rels, ensure_ascii=False, separators=(",", ":"), sort_keys=True))
-        pipe.sadd("wn:all", syn_id)
+        mset_buf[wn_rels_key(syn_id)] = orjson.dumps(rels, option=orjson.OPT_SORT_KEYS)
+        sadd_buf["wn:all"].append(syn_id)
         if pos in ("n", "v", "a", "r"):
-            pipe.sadd(f"wn:idx:pos:{pos}", syn_id)
+            sadd_buf[f"wn:idx:pos:{pos}"].append(syn_id)
         for d in domains:
-            pipe.sadd(f"wn:idx:domain:{d}", syn_id)
-        for ln in sorted(set(lemma_norm)):
-            pipe.sadd(wn_lemma_key(ln), syn_id)
+            sadd_buf[f"wn:idx:domain:{d}"].append(syn_id)
+        for ln in lemmas_sorted:
+            sadd_buf[wn_lemma_key(ln)].append(syn_id)
 
         count += 1
         queued += 1
-        if queued >= args.batch:
+        if queued >= batch:
             flush()
             if count % 20000 == 0:
                 ms = int((time.perf_counter() - t0) * 1000)
-                print(f"progress: {count} synsets ({ms} ms)")
+                print(f"progress{label}: {count} synsets ({ms} ms)")
 
-        if args.limit and count >= args.limit:
+        if limit and count >= limit:
             break
 
     flush()
+    return count
+
+
+def _ingest_pos(pos: str, host: str, port: int, db: int, batch: int) -> int:
+    # Worker process: its own connection and pipeline, one POS partition of WordNet.
+    from nltk.corpus import wordnet as wn  # type: ignore
+
+    r = redis.Redis(host=host, port=port, db=db, decode_responses=False)
+    return ingest_synsets(r, wn.all_synsets(pos=pos), batch=batch, label=f"[{pos}]")
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser(description="Ingest NLTK WordNet → Redis (wn:dict:* bitsets + metadata)")
+    ap.add_argument("--redis-host", default="127.0.0.1")
+    ap.add_argument("--redis-port", type=int, default=6379)
+    ap.add_argument("--redis-db", type=int, default=0)
+    ap.add_argument("--reset", action="store_true", help="Delete existing wn:* keys before ingest")
+    ap.add_argument("--limit", type=int, default=0, help="Ingest only first N synsets (debug)")
+    ap.add_argument("--batch", type=int, default=2000, help="Pipeline batch size")
+    ap.add_argument("--workers", type=int, default=1, help="Ingest processes, one per POS (default 1 = serial; --limit forces serial)")
+    args = ap.parse_args()
+
+    r = redis.Redis(host=args.redis_host, port=args.redis_port, db=args.redis_db, decode_responses=False)
+    r.ping()
+
+    if args.reset:
+        reset_keys(r)
+
+    import nltk  # type: ignore
+    from nltk.corpus import wordnet as wn  # type: ignore
+
+    try:
+        wn.synsets("dog")
+    except LookupError:
+        nltk.download("wordnet")
+        nltk.download("omw-1.4")
+
+    t0 = time.perf_counter()
+    if args.workers > 1 and not args.limit:
+        # One process per POS partition ("a" includes satellite adjectives); the index sets are
+        # plain SADDs, so the partitions merge in Redis without coordination.
+        with ProcessPoolExecutor(max_workers=min(args.workers, len(WN_POS_PARTITIONS))) as ex:
+            futures = [
+                ex.submit(_ingest_pos, pos, args.redis_host, args.redis_port, args.redis_db, args.batch)
+                for pos in WN_POS_PARTITIONS
+            ]
+            count = sum(f.result() for f in futures)
+    else:
+        count = ingest_synsets(r, wn.all_synsets(), batch=args.batch, limit=args.limit)
     ms = int((time.perf_counter() - t0) * 1000)
     print(f"OK: ingested synsets={count} elapsed_ms={ms}")
     return 0